@@ -1,35 +1,47 @@
 #!/usr/bin/env python3
 import sys
-import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 
-def passes_quality_gate(file_path):
-    """Run analysis, allow LOW smells only"""
-    result = subprocess.run([
-        'python', 'cli.py', 'scan', file_path, '-o', '/dev/null'
-    ], capture_output=True, text=True)
-    
-    # PASS if exit 0 OR only low severity (check stderr for "LOW")
-    output = result.stdout + result.stderr
-    if result.returncode == 0:
-        return True
-    if "LOW" in output and "MEDIUM" not in output and "HIGH" not in output:
-        return True
-    return False
-
-staged_files = sys.argv[1:] if len(sys.argv) > 1 else ['.']
-
-failed_files = []
-for file_path in staged_files:
-    if Path(file_path).suffix == '.py':
-        print(f"Analyzing: {file_path}")
-        if not passes_quality_gate(file_path):
-            failed_files.append(file_path)
-
-if failed_files:
-    print("Quality gate failed! Fix these files:")
-    for f in failed_files:
-        print(f"   {f}")
-    sys.exit(1)
-
-print(" All staged Python files passed quality gate!")
+from code_quality_analyzer import CodeQualityAnalyzer, ANALYZER_VERSION
+from scan_cache import ScanCache
+
+BLOCKING_SEVERITIES = {"medium", "high", "critical"}
+
+def passes_quality_gate(file_path, analyzer=None):
+    """Run analysis in-process, allow LOW smells only"""
+    analyzer = analyzer or CodeQualityAnalyzer()
+    try:
+        analyzer.analyze_file(file_path)
+    except (OSError, SyntaxError, ValueError) as e:
+        print(f"   Could not analyze {file_path}: {e}")
+        return False
+
+    file_smells = analyzer.files[file_path].smells
+    return not any(s.severity in BLOCKING_SEVERITIES for s in file_smells)
+
+if __name__ == "__main__":
+    staged_files = sys.argv[1:] if len(sys.argv) > 1 else ['.']
+    py_files = [f for f in staged_files if Path(f).suffix == '.py']
+
+    cache = ScanCache(ANALYZER_VERSION)
+    analyzer = CodeQualityAnalyzer(cache=cache)
+
+    failed_files = []
+    with ThreadPoolExecutor() as executor:
+        # map yields in input order, so each line prints once its file is done
+        for file_path, passed in zip(py_files, executor.map(partial(passes_quality_gate, analyzer=analyzer), py_files)):
+            print(f"Analyzed: {file_path}")
+            if not passed:
+                failed_files.append(file_path)
+
+    cache.save()
+
+    if failed_files:
+        print("Quality gate failed! Fix these files:")
+        for f in failed_files:
+            print(f"   {f}")
+        sys.exit(1)
+
+    print(" All staged Python files passed quality gate!")
@@ -0,0 +1,23 @@
+import re
+from typing import Any
+
+import orjson
+
+# A model reply wrapped in a Markdown fence: ```json ... ``` (or ```python).
+# Longer alternatives first, or "py" would win and leave "thon" behind.
+FENCE_RE = re.compile(r"^\s*```(?:json|python|py)?\s*|\s*```\s*$")
+# Stray fences anywhere in returned code; longest alternative first here too
+CODE_FENCE_RE = re.compile(r"```(?:python|py)?")
+
+
+def loads_ai_json(content: str) -> Any:
+    """orjson.loads a model reply; only strip Markdown fences if the plain parse fails."""
+    try:
+        return orjson.loads(content)
+    except orjson.JSONDecodeError:
+        return orjson.loads(FENCE_RE.sub("", content))
+
+
+def strip_code_fences(code: str) -> str:
+    """Remove Markdown fences a model put around (or inside) returned code."""
+    return CODE_FENCE_RE.sub("", code).strip()
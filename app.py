@@ -254,8 +254,7 @@ if run_button:
             analyzer.analyze_file(str(uploaded_file))
             project_metrics = analyzer.compute_project_metrics()
         else:
-            _ = analyzer.analyze_project(str(project_root))
-            project_metrics = analyzer.compute_project_metrics()
+            project_metrics = analyzer.analyze_project(str(project_root))
 
         smells = analyzer.smells
 
@@ -428,9 +427,7 @@ with tab_autofix:
                             smells, allowed_smells=selected_smells
                         )
 
-                from dataclasses import asdict
-
-                fixes_dict = [asdict(fx) for fx in fixes]
+                fixes_dict = [fx.as_dict() for fx in fixes]
                 applied_count = sum(1 for fx in fixes if fx.applied)
 
                 st.success(f"Applied {applied_count} fixes. See table below.")
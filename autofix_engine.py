@@ -1,15 +1,20 @@
 # autofix_engine.py
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+from bisect import bisect_left
+from collections import Counter, defaultdict
 import ast
 import json
 
+from ast_cache import get_tree_and_lines, iter_def_nodes, invalidate as invalidate_ast_cache
 from ollama_engine import OllamaReviewEngine
 from openrouter_engine import OpenRouterReviewEngine
 
+UNUSED_IMPORT_MARKER = b"# AUTO-FIX: unused import\n"
 
-@dataclass
+
+@dataclass(slots=True)
 class AutoFix:
     file: str
     line: int
@@ -20,6 +25,19 @@ class AutoFix:
     applied: bool
     reason: str
 
+    def as_dict(self) -> Dict[str, Any]:
+        """Field dict for the JSON fix log (all fields are flat)."""
+        return {
+            "file": self.file,
+            "line": self.line,
+            "smell_type": self.smell_type,
+            "node_name": self.node_name,
+            "original_code": self.original_code,
+            "fixed_code": self.fixed_code,
+            "applied": self.applied,
+            "reason": self.reason,
+        }
+
 
 class AutoFixEngine:
     def __init__(self, use_openrouter: bool = False):
@@ -46,19 +64,22 @@ class AutoFixEngine:
             if not path.is_file():
                 continue
 
-            lines = path.read_text(encoding="utf-8", errors="ignore").splitlines()
+            data = path.read_bytes()
+            line_starts = self._line_offsets(data)
+            edited = set()  # line indices to prefix with the marker comment
 
             for smell in file_smells:
                 if smell.type != "unused_imports":
                     continue
 
                 idx = max(0, smell.line - 1)
-                if idx >= len(lines):
+                if idx >= len(line_starts):
                     continue
 
-                original_line = lines[idx]
+                end = line_starts[idx + 1] if idx + 1 < len(line_starts) else len(data)
+                original_line = data[line_starts[idx]:end].decode("utf-8", errors="ignore").rstrip("\r\n")
 
-                if original_line.lstrip().startswith("#"):
+                if idx in edited or original_line.lstrip().startswith("#"):
                     fixes.append(
                         AutoFix(
                             file=file_path,
@@ -74,7 +95,7 @@ class AutoFixEngine:
                     continue
 
                 fixed_line = "# AUTO-FIX: unused import\n" + original_line
-                lines[idx] = fixed_line
+                edited.add(idx)
 
                 fixes.append(
                     AutoFix(
@@ -89,10 +110,29 @@ class AutoFixEngine:
                     )
                 )
 
-            path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+            if edited:
+                # Copy the untouched byte ranges and splice the markers in, in one pass
+                out = bytearray()
+                prev = 0
+                for idx in sorted(edited):
+                    out += data[prev:line_starts[idx]]
+                    out += UNUSED_IMPORT_MARKER
+                    prev = line_starts[idx]
+                out += data[prev:]
+                path.write_bytes(out)
 
         return fixes
 
+    @staticmethod
+    def _line_offsets(data: bytes) -> List[int]:
+        """Byte offset of the start of every line in data (no entry for a trailing newline)."""
+        offsets = [0] if data else []
+        pos = data.find(b"\n")
+        while pos != -1 and pos + 1 < len(data):
+            offsets.append(pos + 1)
+            pos = data.find(b"\n", pos + 1)
+        return offsets
+
     # ------------------------------
     # AI HELPERS
     # ------------------------------
@@ -104,6 +144,16 @@ class AutoFixEngine:
             return self.ollama.get_fix(smell, before_src)
         return None
 
+    def _get_ai_fixes_batch(self, items: List[tuple]) -> List[Optional[str]]:
+        """Ask the AI engine for all (smell, source) patches of one file in a single call.
+        One entry per item, in order; None where the batch gave no patch."""
+        fixes = None
+        if self.openrouter is not None:
+            fixes = self.openrouter.get_fixes_batch(items)
+        elif self.ollama is not None:
+            fixes = self.ollama.get_fixes_batch(items)
+        return fixes or [None] * len(items)
+
     def _get_node_source(self, source_lines: List[str], node: ast.AST) -> str:
         """Extract the original code for a function/method/class node."""
         start = node.lineno - 1
@@ -119,19 +169,42 @@ class AutoFixEngine:
         new_lines = new_code.splitlines()
         return source_lines[:start] + new_lines + source_lines[end:]
 
-    def _find_target_node(self, tree: ast.AST, smell: Any) -> Optional[ast.AST]:
+    def _index_def_nodes(self, tree: ast.AST) -> Tuple[Dict[str, List[ast.AST]], List[ast.AST]]:
+        """Index a file's FunctionDef/ClassDef nodes by name and by line, in one walk."""
+        by_name: Dict[str, List[ast.AST]] = defaultdict(list)
+        defs = list(iter_def_nodes(tree))
+        for node in defs:
+            by_name[node.name].append(node)
+        return by_name, sorted(defs, key=lambda n: n.lineno)
+
+    def _spans_overlap(self, a: ast.AST, b: ast.AST) -> bool:
+        a_end = getattr(a, "end_lineno", a.lineno)
+        b_end = getattr(b, "end_lineno", b.lineno)
+        return a.lineno <= b_end and b.lineno <= a_end
+
+    def _find_target_node(
+        self, by_name: Dict[str, List[ast.AST]], lines_sorted: List[ast.AST], smell: Any
+    ) -> Optional[ast.AST]:
         """Find the FunctionDef/ClassDef that corresponds to this smell."""
         target_name = getattr(smell, "node_name", None)
         target_line = getattr(smell, "line", None)
 
-        for node in ast.walk(tree):
-            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
-                if target_name and node.name != target_name:
-                    continue
-                if target_line is not None and abs(node.lineno - target_line) > 5:
-                    continue
-                return node
-        return None
+        if target_name:
+            candidates = by_name.get(target_name, [])
+        else:
+            candidates = lines_sorted
+            if target_line is not None:
+                # Only the defs on either side of target_line can be the closest
+                i = bisect_left(lines_sorted, target_line, key=lambda n: n.lineno)
+                candidates = lines_sorted[max(0, i - 1):i + 1]
+
+        if target_line is None:
+            return candidates[0] if candidates else None
+
+        best = min(candidates, key=lambda n: abs(n.lineno - target_line), default=None)
+        if best is None or abs(best.lineno - target_line) > 5:
+            return None
+        return best
 
     # ------------------------------
     # AI-POWERED FIXES
@@ -151,28 +224,67 @@ class AutoFixEngine:
             if not path.is_file():
                 continue
 
-            original_text = path.read_text(encoding="utf-8", errors="ignore")
-            lines = original_text.splitlines()
-            original_backup = original_text  # for rollback
+            original_backup = path.read_bytes()  # for rollback, byte-for-byte
 
             try:
-                tree = ast.parse(original_text)
+                tree, cached_lines = get_tree_and_lines(file_path)
+                lines = list(cached_lines)
             except SyntaxError:
                 print(f" ⚠️ Skipping auto-fix for {file_path} (syntax error).")
                 continue
 
             file_fixes = []  # Track fixes for this file
 
+            by_name, lines_sorted = self._index_def_nodes(tree)
+
+            targets = []
             for smell in file_smells:
                 if smell.type not in allowed_smells:
                     continue
 
-                node = self._find_target_node(tree, smell)
+                node = self._find_target_node(by_name, lines_sorted, smell)
                 if node is None:
                     continue
 
                 before_src = self._get_node_source(lines, node)
-                fixed_src = self._get_ai_fix(smell, before_src)  
+
+                # Each source span may only be rewritten once (same node, or a
+                # method inside a class that is already being patched)
+                if any(self._spans_overlap(node, other) for _, other, _ in targets):
+                    fixes.append(
+                        AutoFix(
+                            file=file_path,
+                            line=smell.line,
+                            smell_type=smell.type,
+                            node_name=getattr(smell, "node_name", ""),
+                            original_code=before_src,
+                            fixed_code="",
+                            applied=False,
+                            reason="Overlaps a node already patched for another smell",
+                        )
+                    )
+                    continue
+
+                targets.append((smell, node, before_src))
+
+            # Rewrite bottom-up so earlier nodes' line numbers stay valid
+            targets.sort(key=lambda t: -t[1].lineno)
+
+            # One AI request for the whole file; per-smell requests only for misses.
+            # Targets sharing a name (A.__init__, B.__init__) are easy for the model
+            # to mix up, so those always get their own request.
+            name_counts = Counter(getattr(smell, "node_name", "") for smell, _, _ in targets)
+            batched = [i for i, (smell, _, _) in enumerate(targets)
+                       if name_counts[getattr(smell, "node_name", "")] == 1]
+            batch_fixes: Dict[int, str] = {}
+            if len(batched) > 1:
+                patches = self._get_ai_fixes_batch(
+                    [(targets[i][0], targets[i][2]) for i in batched]
+                )
+                batch_fixes = {i: patch for i, patch in zip(batched, patches) if patch}
+
+            for i, (smell, node, before_src) in enumerate(targets):
+                fixed_src = batch_fixes.get(i) or self._get_ai_fix(smell, before_src)
                 if not fixed_src:
                     fixes.append(
                         AutoFix(
@@ -207,12 +319,13 @@ class AutoFixEngine:
             try:
                 ast.parse(new_text)
                 path.write_text(new_text, encoding="utf-8")
+                invalidate_ast_cache()
                 # All good, commit fixes
                 fixes.extend(file_fixes)
                 print(f" ✅ AI fixes applied to {path.name}")
             except SyntaxError:
                 print(f" ❌ AI patch broke syntax in {file_path}. Rolling back.")
-                path.write_text(original_backup, encoding="utf-8")
+                path.write_bytes(original_backup)
                 # Mark all fixes for this file as failed
                 for fx in file_fixes:
                     fx.applied = False
@@ -16,22 +16,71 @@ import ast
 import json
 import csv
 import math
-from collections import defaultdict, Counter
-from dataclasses import dataclass, asdict
-from typing import List, Dict, Any, Optional
+from collections import defaultdict, deque, Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from typing import List, Dict, Any, Optional, Iterator
 from pathlib import Path
 from datetime import datetime # Added for realism, used in sample_code
 import sys
 import os
 
+from ast_cache import get_tree
+
 # Fix Windows emoji encoding
 if sys.platform == "win32":
     sys.stdout.reconfigure(encoding='utf-8')
     os.system('chcp 65001 > nul')  # Silent UTF-8 mode
 
 
+# Bump whenever detection or scoring changes so cached scan results are discarded
+ANALYZER_VERSION = "1.2.0"
+
+# Below this many files to (re)analyze, worker start-up costs more than it saves
+PARALLEL_ANALYSIS_THRESHOLD = 32
+
+# Operator vocabulary assumed by the Halstead volume estimate
+_HALSTEAD_OPERATORS = frozenset(['+', '-', '*', '/', '==', '!=', 'and', 'or'])
+
+# Long-method severity indexed by statement count (the last entry covers everything longer)
+_METHOD_SEVERITY_BY_LINES = ("low",) * 26 + ("medium",) * 10 + ("high",) * 15 + ("critical",)
+
+# Directories never worth descending into when looking for project sources
+SKIP_DIRS = {
+    '.git', '__pycache__', 'node_modules', '.venv', 'venv',
+    'build', 'dist', '.tox', '.mypy_cache',
+}
+
+
+def iter_py_entries(root):
+    """Yield os.DirEntry objects for the .py files under root, pruning SKIP_DIRS and hidden directories.
 
-@dataclass
+    Uses os.scandir directly so the type info from each directory listing
+    is reused instead of stat()-ing every entry again.
+    """
+    try:
+        with os.scandir(root) as entries:
+            subdirs = []
+            for entry in entries:
+                name = entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    if name not in SKIP_DIRS and not name.startswith('.'):
+                        subdirs.append(entry.path)
+                elif name.endswith('.py') and not name.startswith('__') and entry.is_file():
+                    yield entry
+    except (PermissionError, NotADirectoryError):
+        return
+    # Recurse after closing this directory's handle, files before subdirectories like os.walk
+    for subdir in subdirs:
+        yield from iter_py_entries(subdir)
+
+
+def iter_py_files(root):
+    """Yield the paths of the .py files under root (see iter_py_entries)."""
+    for entry in iter_py_entries(root):
+        yield entry.path
+
+@dataclass(slots=True, frozen=True)
 class CodeSmell:
     """Represents a detected code smell with severity."""
     type: str
@@ -41,7 +90,18 @@ class CodeSmell:
     severity: str
     description: str
 
-@dataclass
+    def as_dict(self) -> Dict[str, Any]:
+        """Field dict for reports (all fields are flat), cheaper than dataclasses.asdict."""
+        return {
+            "type": self.type,
+            "file": self.file,
+            "node_name": self.node_name,
+            "line": self.line,
+            "severity": self.severity,
+            "description": self.description,
+        }
+
+@dataclass(slots=True)
 class FileMetrics:
     """File-level quality metrics."""
     file_path: str
@@ -50,12 +110,23 @@ class FileMetrics:
     smells: List[CodeSmell]
     quality_score: float
 
+    def as_dict(self) -> Dict[str, Any]:
+        """Same shape as dataclasses.asdict, without its generic recursive deep copy."""
+        return {
+            "file_path": self.file_path,
+            "loc": self.loc,
+            "mi": self.mi,
+            "smells": [smell.as_dict() for smell in self.smells],
+            "quality_score": self.quality_score,
+        }
+
 class CodeQualityAnalyzer:
     """Main analyzer system."""
 
-    def __init__(self):
+    def __init__(self, cache=None):
         self.smells = []  # All detected smells
         self.files = {}   # File metrics
+        self.cache = cache  # Optional ScanCache of FileMetrics from earlier runs
         self.severity_weights = {
             'low': 1, 'medium': 2, 'high': 3, 'critical': 5
         }
@@ -63,69 +134,103 @@ class CodeQualityAnalyzer:
     def analyze_project(self, project_path: str) -> Dict[str, Any]:
         """Analyze entire project """
         # print("PROJECT CODE QUALITY ANALYSIS STARTED")
-        project_path = Path(project_path)
-
         # Step 1: Parse all Python files
-        for py_file in project_path.rglob("*.py"):
-            if py_file.is_file() and not py_file.name.startswith('__'):
-                print(f"  Analyzing: {py_file.name}")
-                self.analyze_file(str(py_file))
+        for _ in self.iter_smells(project_path):
+            pass
 
         # Step 2: Compute project-level metrics
         project_metrics = self.compute_project_metrics()
 
         return project_metrics
 
+    def iter_smells(self, project_path: str) -> Iterator[List[CodeSmell]]:
+        """Analyze a project file by file, yielding each file's smells as soon as it is done.
+
+        Files are independent, so on multi-core machines the ones not
+        served from the cache are analyzed in worker processes; results
+        are still merged (and yielded) in discovery order.
+        """
+        py_files = list(iter_py_files(project_path))
+        cached = {}
+        if self.cache is not None:
+            for py_file in py_files:
+                metrics = self._cached_metrics(py_file)
+                if metrics is not None:
+                    cached[py_file] = metrics
+        to_analyze = [f for f in py_files if f not in cached]
+
+        workers = os.cpu_count() or 1
+        if workers > 1 and len(to_analyze) > PARALLEL_ANALYSIS_THRESHOLD:
+            # ~4 chunks per worker: few enough to amortize IPC, enough to balance uneven files
+            chunksize = max(1, len(to_analyze) // (workers * 4))
+            with ProcessPoolExecutor() as ex:
+                analyzed = ex.map(_analyze_file_worker, to_analyze, chunksize=chunksize)
+                yield from self._merge_results(py_files, cached, analyzed)
+        else:
+            analyzed = (self._measure_file(f) for f in to_analyze)
+            yield from self._merge_results(py_files, cached, analyzed)
+
+    def _merge_results(self, py_files: List[str], cached: Dict[str, "FileMetrics"],
+                       analyzed: Iterator["FileMetrics"]) -> Iterator[List[CodeSmell]]:
+        """Record cached and freshly analyzed metrics in py_files order."""
+        for py_file in py_files:
+            print(f"  Analyzing: {os.path.basename(py_file)}")
+            metrics = cached.get(py_file)
+            if metrics is None:
+                metrics = next(analyzed)
+                if self.cache is not None:
+                    self.cache.put(py_file, metrics)
+            self.files[py_file] = metrics
+            self.smells.extend(metrics.smells)
+            yield metrics.smells
+
     def analyze_file(self, file_path: str):
         """DETAILED FILE ANALYSIS - Detects ALL code smells."""
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            tree = ast.parse(f.read())
-            metrics = FileMetrics(
+        metrics = self._cached_metrics(file_path)
+        if metrics is None:
+            metrics = self._measure_file(file_path)
+            if self.cache is not None:
+                self.cache.put(file_path, metrics)
+        self.files[file_path] = metrics
+        self.smells.extend(metrics.smells)
+
+    def _cached_metrics(self, file_path: str) -> Optional["FileMetrics"]:
+        if self.cache is None:
+            return None
+        cached = self.cache.get(file_path)
+        if cached is None:
+            return None
+        # Cached entries may have been recorded under another spelling of the path
+        return replace(
+            cached,
             file_path=file_path,
-            loc=len([n for n in ast.walk(tree) if isinstance(n, ast.stmt)]),
+            smells=[replace(s, file=file_path) for s in cached.smells],
+        )
+
+    def _measure_file(self, file_path: str) -> "FileMetrics":
+        """Run every detector and metric over one file (no cache, no bookkeeping)."""
+        tree = get_tree(file_path)
+
+        # One walk over the tree feeds every per-node detector and metric
+        visitor = _SmellVisitor(self, file_path)
+        visitor.visit(tree)
+
+        metrics = FileMetrics(
+            file_path=file_path,
+            loc=visitor.stmt_count,
             mi=0.0,               # Will compute below
             smells=[],
             quality_score=0.0
         )
 
         # SMELL DETECTION 1: LONG METHODS (Functions > 20 lines)
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                func_lines = self.count_lines(node)
-                if func_lines > 20:  # LONG METHOD SMELL
-                    severity = self.get_method_severity(func_lines)
-                    smell = CodeSmell(
-                        type="long_method",
-                        file=file_path,
-                        node_name=node.name,
-                        line=node.lineno,
-                        severity=severity,
-                        description=f"Function {node.name}: {func_lines} lines"
-                    )
-                    metrics.smells.append(smell)
+        metrics.smells.extend(visitor.long_methods)
 
         # SMELL DETECTION 2: GOD CLASS (Classes > 100 lines or >10 methods)
-        class_methods = defaultdict(int)
-        for node in ast.walk(tree):
-            if isinstance(node, ast.ClassDef):
-                class_lines = self.count_lines(node)
-                methods = sum(1 for n in ast.walk(node) if isinstance(n, ast.FunctionDef))
-                class_methods[node.name] = methods
-
-                if class_lines > 100 or methods > 10:
-                    severity = "critical" if class_lines > 200 or methods > 15 else "high"
-                    smell = CodeSmell(
-                        type="god_class",
-                        file=file_path,
-                        node_name=node.name,
-                        line=node.lineno,
-                        severity=severity,
-                        description=f"Class {node.name}: {class_lines}loc, {methods} methods"
-                    )
-                    metrics.smells.append(smell)
+        metrics.smells.extend(visitor.god_classes)
 
         # SMELL DETECTION 3: DEEP NESTING (>4 levels)
-        max_nesting = self.find_max_nesting(tree)
+        max_nesting = visitor.max_depth
         if max_nesting > 4:
             severity = "high" if max_nesting > 6 else "medium"
             smell = CodeSmell(
@@ -139,281 +244,98 @@ class CodeQualityAnalyzer:
             metrics.smells.append(smell)
 
         # SMELL DETECTION 4: LONG PARAMETER LIST (>4 args)
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                param_count = len(node.args.args)
-                if param_count > 4:
-                    severity = "high" if param_count > 6 else "medium"
-                    smell = CodeSmell(
-                        type="long_parameter_list",
-                        file=file_path,
-                        node_name=node.name,
-                        line=node.lineno,
-                        severity=severity,
-                        description=f"Function {node.name}: {param_count} parameters"
-                    )
-                    metrics.smells.append(smell)
+        metrics.smells.extend(visitor.long_parameter_lists)
 
         # SMELL DETECTION 5: MISSING TYPE HINTS (no annotations)
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                has_annotations = any(arg.annotation is not None for arg in node.args.args)
-                has_return_hint = node.returns is not None
-                if not has_annotations and not has_return_hint:
-                    severity = "medium" if len(node.args.args) > 2 else "low"
-                    smell = CodeSmell(
-                        type="missing_type_hints",
-                        file=file_path,
-                        node_name=node.name,
-                        line=node.lineno,
-                        severity=severity,
-                        description=f"Function {node.name}: no parameter or return type hints"
-                    )
-                    metrics.smells.append(smell)
+        metrics.smells.extend(visitor.missing_type_hints)
 
         # SMELL DETECTION 6: UNUSED IMPORTS
-        imported_names = set()
-        used_names = set()
-
-        # Collect imported names
-        for node in ast.walk(tree):
-            if isinstance(node, (ast.Import, ast.ImportFrom)):
-                for alias in node.names:
-                    imported_names.add(alias.name.split('.')[0])
-
-        # Collect used names (simple version)
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load):
-                used_names.add(node.id)
-
-        unused_imports = imported_names - used_names
+        # Checked in import order, so the names reported are stable run to run
+        used_names = visitor.used_names
+        unused_imports = [name for name in visitor.imported_names if name not in used_names]
         if unused_imports:
             severity = "low"
             smell = CodeSmell(
                 type="unused_imports",
                 file=file_path,
-                node_name=", ".join(list(unused_imports)[:3]),
+                node_name=", ".join(unused_imports[:3]),
                 line=1,
                 severity=severity,
-                description=f"Unused imports: {', '.join(list(unused_imports)[:3])}"
+                description=f"Unused imports: {', '.join(unused_imports[:3])}"
             )
             metrics.smells.append(smell)
 
         # SMELL DETECTION 7: MANY LOCAL VARIABLES
-        for node in ast.walk(tree):
-            if not isinstance(node, ast.FunctionDef):
-                continue
-
-            local_vars = set()
-
-            for inner in ast.walk(node):
-                # Simple Assign: x = ...
-                if isinstance(inner, ast.Assign):
-                    for target in inner.targets:
-                        if isinstance(target, ast.Name):
-                            local_vars.add(target.id)
-                        elif isinstance(target, ast.Tuple):
-                            for elt in target.elts:
-                                if isinstance(elt, ast.Name):
-                                    local_vars.add(elt.id)
-
-                # Annotated assignment: x: int = ...
-                elif isinstance(inner, ast.AnnAssign):
-                    if isinstance(inner.target, ast.Name):
-                        local_vars.add(inner.target.id)
-
-            local_count = len(local_vars)
-
-            if local_count > 8:  # threshold; adjust if needed
-                severity = "medium" if local_count <= 15 else "high"
-                smell = CodeSmell(
-                    type="many_local_variables",
-                    file=file_path,
-                    node_name=node.name,
-                    line=node.lineno,
-                    severity=severity,
-                    description=(
-                        f"Function defines {local_count} local variables; "
-                        "consider splitting into smaller functions."
-                    ),
-                )
-                metrics.smells.append(smell)
+        metrics.smells.extend(visitor.many_local_variables)
 
         # SMELL DETECTION 8: FEATURE ENVY (heuristic)
-        for class_node in ast.walk(tree):
-            if not isinstance(class_node, ast.ClassDef):
-                continue
-
-            for node in class_node.body:
-                if not isinstance(node, ast.FunctionDef):
-                    continue
-
-                base_counts = {}
-
-                for attr in ast.walk(node):
-                    if isinstance(attr, ast.Attribute) and isinstance(attr.value, ast.Name):
-                        base = attr.value.id  # e.g. self, user, order
-                        base_counts[base] = base_counts.get(base, 0) + 1
-
-                if not base_counts:
-                    continue
-
-                self_count = base_counts.get("self", 0)
-
-                # Find most-used foreign base
-                foreign_items = [(b, c) for b, c in base_counts.items() if b != "self"]
-                if not foreign_items:
-                    continue
-
-                foreign_base, foreign_count = max(foreign_items, key=lambda x: x[1])
-
-                # Thresholds: must see foreign object enough times and clearly more than self
-                if foreign_count >= 5 and foreign_count >= 2 * max(1, self_count):
-                    smell = CodeSmell(
-                        type="feature_envy",
-                        file=file_path,
-                        node_name=f"{class_node.name}.{node.name}",
-                        line=node.lineno,
-                        severity="medium",
-                        description=(
-                            f"Method uses attributes of '{foreign_base}' much more "
-                            "than 'self'; consider moving or refactoring."
-                        ),
-                    )
-                    metrics.smells.append(smell)
+        metrics.smells.extend(visitor.feature_envy)
 
         # SMELL DETECTION 9: EXCEPTION SWALLOWING
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Try):
-                for handler in node.handlers:
-                    # Broad except: bare "except:" or "except Exception:"
-                    is_bare_except = handler.type is None
-                    is_exception = (
-                        isinstance(handler.type, ast.Name)
-                        and handler.type.id == "Exception"
-                    )
-
-                    if not (is_bare_except or is_exception):
-                        continue
+        metrics.smells.extend(visitor.exception_swallowing)
 
-                    # Body effectively empty or just "pass"
-                    body = handler.body
-                    body_is_empty = len(body) == 0
-                    body_is_pass_only = (
-                        len(body) == 1 and isinstance(body[0], ast.Pass)
-                    )
-
-                    if body_is_empty or body_is_pass_only:
-                        smell = CodeSmell(
-                            type="exception_swallowing",
-                            file=file_path,
-                            node_name="<module>",
-                            line=handler.lineno,
-                            severity="high",
-                            description=(
-                                "Exception swallowed with broad 'except' "
-                                "and no real handling."
-                            ),
-                        )
-                        metrics.smells.append(smell)
         # SMELL DETECTION 10: UNREACHABLE CODE
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                self._mark_unreachable_in_block(
-                    file_path=file_path,
-                    func_name=node.name,
-                    block=node.body,
-                    metrics=metrics,
-                )
-
-
+        metrics.smells.extend(visitor.unreachable_code)
 
         # MAINTAINABILITY INDEX CALCULATION (MI Formula)
-        cc = self.cyclomatic_complexity(tree)  # Branches/loops
-        hv = self.halstead_volume(tree)        # Vocabulary complexity
+        cc = visitor.complexity                  # Branches/loops
+        hv = self._halstead_from_counts(visitor.binop_count, visitor.operands)  # Vocabulary complexity
         metrics.mi = self.calculate_mi(hv, cc, metrics.loc)
 
         # QUALITY SCORE (0-10): MI + smell penalty
         smell_penalty = sum(self.severity_weights[s.severity] for s in metrics.smells)
         metrics.quality_score = max(0, (metrics.mi / 20) - (smell_penalty * 0.5))
 
-        self.files[file_path] = metrics
-        self.smells.extend(metrics.smells)
+        return metrics
 
     def _mark_unreachable_in_block(self, file_path: str, func_name: str,
-                                block: list, metrics):
-        """Detect unreachable statements in a linear block of statements."""
-        dead = False
-        for stmt in block:
-            # If we've already hit a terminating statement in this block,
-            # everything that follows is unreachable.
-            if dead:
-                smell = CodeSmell(
-                    type="unreachable_code",
-                    file=file_path,
-                    node_name=func_name,
-                    line=getattr(stmt, "lineno", 1),
-                    severity="medium",
-                    description="Statement is unreachable (after return/raise/break/continue).",
-                )
-                metrics.smells.append(smell)
-
-            # If this statement ends control flow in this block, mark remaining as dead
-            if isinstance(stmt, (ast.Return, ast.Raise, ast.Break, ast.Continue)):
-                dead = True
-
-            # Recurse into nested blocks
-            if isinstance(stmt, (ast.If, ast.For, ast.While, ast.With,
-                                ast.AsyncFor, ast.AsyncWith, ast.Try)):
-                # For all these, we need to walk their internal statement lists
-                for attr_name in ("body", "orelse", "finalbody", "handlers"):
-                    sub = getattr(stmt, attr_name, None)
-                    if not sub:
-                        continue
+                                block: list, smells: List[CodeSmell]):
+        """Detect unreachable statements in a linear block of statements.
+
+        Nested blocks are handled with an explicit stack of [statements, dead]
+        frames rather than recursion, visiting them in the same depth-first
+        order (body, orelse, finalbody, then each handler's body).
+        """
+        work = [[iter(block), False]]
+        while work:
+            frame = work[-1]
+            for stmt in frame[0]:
+                # If we've already hit a terminating statement in this block,
+                # everything that follows is unreachable.
+                if frame[1]:
+                    smell = CodeSmell(
+                        type="unreachable_code",
+                        file=file_path,
+                        node_name=func_name,
+                        line=getattr(stmt, "lineno", 1),
+                        severity="medium",
+                        description="Statement is unreachable (after return/raise/break/continue).",
+                    )
+                    smells.append(smell)
+
+                # If this statement ends control flow in this block, mark remaining as dead
+                if isinstance(stmt, (ast.Return, ast.Raise, ast.Break, ast.Continue)):
+                    frame[1] = True
 
+                # Descend into nested blocks before the rest of this one
+                if isinstance(stmt, (ast.If, ast.For, ast.While, ast.With,
+                                    ast.AsyncFor, ast.AsyncWith, ast.Try)):
                     # For Try, handlers is a list of ExceptHandler objects,
                     # each with its own .body
-                    if attr_name == "handlers":
-                        for handler in sub:
-                            self._mark_unreachable_in_block(
-                                file_path, func_name, handler.body, metrics
-                            )
-                    else:
-                        self._mark_unreachable_in_block(
-                            file_path, func_name, sub, metrics
-                        )
-
-
-
+                    sub_blocks = [stmt.body, getattr(stmt, "orelse", None), getattr(stmt, "finalbody", None)]
+                    sub_blocks.extend(handler.body for handler in getattr(stmt, "handlers", ()))
+                    work.extend([iter(sub), False] for sub in reversed(sub_blocks) if sub)
+                    break
+            else:
+                work.pop()
 
     def count_lines(self, node: ast.AST) -> int:
         """Count logical lines for a node."""
         return len([n for n in ast.walk(node) if isinstance(n, ast.stmt)])
 
     def get_method_severity(self, lines: int) -> str:
-        """Severity classification for long methods."""
-        if lines > 50: return "critical"
-        elif lines > 35: return "high"
-        elif lines > 25: return "medium"
-        return "low"
-
-    def find_max_nesting(self, node: ast.AST, depth: int = 0, max_depth: List[int] = None) -> int:
-        """Detect deep nesting levels."""
-        if max_depth is None:
-            max_depth = [0]
-
-        max_depth[0] = max(max_depth[0], depth)
-
-        # Iterate over all child nodes
-        for child in ast.iter_child_nodes(node):
-            # If the child node is a control flow construct, increment depth for its children
-            if isinstance(child, (ast.If, ast.For, ast.While, ast.With, ast.AsyncFor, ast.AsyncWith, ast.Try)):
-                self.find_max_nesting(child, depth + 1, max_depth)
-            # For other types of nodes, continue traversing at the current depth
-            else:
-                self.find_max_nesting(child, depth, max_depth) # Recurse without increasing depth for non-control-flow nodes
-
-        return max_depth[0]
+        """Severity classification for long methods: >50 critical, >35 high, >25 medium."""
+        return _METHOD_SEVERITY_BY_LINES[min(lines, len(_METHOD_SEVERITY_BY_LINES) - 1)]
 
     def cyclomatic_complexity(self, tree: ast.AST) -> int:
         """ cyclomatic complexity (branches/loops)."""
@@ -427,23 +349,19 @@ class CodeQualityAnalyzer:
 
     def halstead_volume(self, tree: ast.AST) -> float:
         """Simplified Halstead Volume """
-        operators = set(['+', '-', '*', '/', '==', '!=', 'and', 'or'])
         operands = set()
         total_tokens = 0
 
         for node in ast.walk(tree):
             if isinstance(node, ast.BinOp):
                 total_tokens += 1
+                _add_binop_operands(node, operands)
 
-                if isinstance(node.left, ast.Name):
-                    operands.add(str(node.left.id))
-                else:
-                    operands.add(type(node.left).__name__) # Add the type name as an operand
+        return self._halstead_from_counts(total_tokens, operands)
 
-                if isinstance(node.right, ast.Name):
-                    operands.add(str(node.right.id))
-                else:
-                    operands.add(type(node.right).__name__) # Add the type name as an operand
+    def _halstead_from_counts(self, total_tokens: int, operands: set) -> float:
+        """Halstead volume from the BinOp count and the distinct operand set."""
+        operators = _HALSTEAD_OPERATORS
 
         # If no binary operations are found, total_tokens will be 0.
         # This will result in hv being 0, which then causes a math domain error in math.log(hv).
@@ -457,7 +375,6 @@ class CodeQualityAnalyzer:
 
         return float(total_tokens) * math.log2(log_arg)
 
-
     def calculate_mi(self, hv: float, cc: int, loc: int) -> float:
         """Standard MI formula: 171 - 5.2ln(HV) - 0.23CC - 16.2ln(LOC)."""
         # Ensure hv and loc are at least 1 to prevent math domain errors for math.log(0)
@@ -465,21 +382,32 @@ class CodeQualityAnalyzer:
         loc = max(1, loc) # loc should be at least 1 for any file with code
         return min(100, max(0, 171 - 5.2 * math.log(hv) - 0.23 * cc - 16.2 * math.log(loc)))
 
-    def compute_project_metrics(self, docstring_coverage: float | None = None) -> Dict[str, Any]:
-        """PROJECT-LEVEL AGGREGATION & SCORING."""
+    def compute_project_metrics(self, docstring_coverage: float | None = None,
+                                include_files: bool = True) -> Dict[str, Any]:
+        """PROJECT-LEVEL AGGREGATION & SCORING.
+
+        include_files=False leaves out the per-file breakdown (needed only
+        for reports), skipping a dict copy of every file and smell.
+        """
         total_smells = len(self.smells)
-        total_severity = sum(self.severity_weights[s.severity] for s in self.smells)
     
         if len(self.files) == 0:
             avg_quality = 0.0
             project_mi = 0.0
         else:
-            avg_quality = sum(f.quality_score for f in self.files.values()) / len(self.files)
-            total_loc = sum(f.loc for f in self.files.values())
+            # One pass over the files for all three sums
+            total_quality = 0.0
+            total_loc = 0
+            weighted_mi = 0.0
+            for f in self.files.values():
+                total_quality += f.quality_score
+                total_loc += f.loc
+                weighted_mi += f.mi * f.loc
+            avg_quality = total_quality / len(self.files)
             if total_loc == 0:
                 project_mi = 0.0
             else:
-                project_mi = sum(f.mi * f.loc for f in self.files.values()) / total_loc
+                project_mi = weighted_mi / total_loc
     
         severity_dist = Counter(s.severity for s in self.smells)
     
@@ -489,8 +417,9 @@ class CodeQualityAnalyzer:
             "total_files": len(self.files),
             "total_smells": total_smells,
             "severity_distribution": dict(severity_dist),
-            "files": {path: asdict(metrics) for path, metrics in self.files.items()},
         }
+        if include_files:
+            result["files"] = {path: metrics.as_dict() for path, metrics in self.files.items()}
     
         if docstring_coverage is not None:
             result["docstring_coverage"] = round(docstring_coverage, 1)
@@ -515,38 +444,13 @@ class CodeQualityAnalyzer:
 
         # 2. CSV Report (EXISTING - your code stays exactly same)
         csv_path = output_dir / "project_quality_report.csv"
-        flat_rows = []
-        for file_path, metrics in project_metrics['files'].items():
-            if metrics['smells']:
-                for smell in metrics['smells']:
-                    flat_rows.append({
-                        'file': file_path,
-                        'smell_type': smell['type'],
-                        'function_class': smell['node_name'],
-                        'line': smell['line'],
-                        'severity': smell['severity'],
-                        'description': smell['description'],
-                        'file_mi': metrics['mi'],
-                        'file_quality': metrics['quality_score']
-                    })
-            else:
-                flat_rows.append({
-                    'file': file_path,
-                    'smell_type': '',
-                    'function_class': '',
-                    'line': '',
-                    'severity': '',
-                    'description': 'No code smells detected',
-                    'file_mi': metrics['mi'],
-                    'file_quality': metrics['quality_score']
-                })
-
-        if flat_rows:
+        if project_metrics['files']:
             with open(csv_path, 'w', newline='') as f:
                 fieldnames = ['file', 'smell_type', 'function_class', 'line', 'severity', 'description', 'file_mi', 'file_quality']
                 writer = csv.DictWriter(f, fieldnames=fieldnames)
                 writer.writeheader()
-                writer.writerows(flat_rows)
+                # Rows are generated as they are written, never held all at once
+                writer.writerows(self._iter_csv_rows(project_metrics))
         print(f" CSV Report: {csv_path}")
 
         # 3. NEW HTML Report
@@ -580,6 +484,34 @@ class CodeQualityAnalyzer:
 
 
 
+    @staticmethod
+    def _iter_csv_rows(project_metrics: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """One CSV row per smell, or a single placeholder row for a clean file."""
+        for file_path, metrics in project_metrics['files'].items():
+            if metrics['smells']:
+                for smell in metrics['smells']:
+                    yield {
+                        'file': file_path,
+                        'smell_type': smell['type'],
+                        'function_class': smell['node_name'],
+                        'line': smell['line'],
+                        'severity': smell['severity'],
+                        'description': smell['description'],
+                        'file_mi': metrics['mi'],
+                        'file_quality': metrics['quality_score']
+                    }
+            else:
+                yield {
+                    'file': file_path,
+                    'smell_type': '',
+                    'function_class': '',
+                    'line': '',
+                    'severity': '',
+                    'description': 'No code smells detected',
+                    'file_mi': metrics['mi'],
+                    'file_quality': metrics['quality_score']
+                }
+
     def _generate_html_report(self, project_metrics: Dict[str, Any], output_directory: str):
         """Generate beautiful HTML dashboard."""
         output_dir = Path(output_directory)
@@ -595,7 +527,7 @@ class CodeQualityAnalyzer:
 
         severity_counts = Counter(s['severity'] for s in all_smells)
 
-        html_content = f"""<!DOCTYPE html>
+        parts = [f"""<!DOCTYPE html>
     <html>
     <head>
         <title> AI Code Review Dashboard</title>
@@ -655,18 +587,19 @@ class CodeQualityAnalyzer:
     
             <table>
                 <tr><th>File</th><th>Smells</th><th>Critical</th><th>High</th><th>Medium</th><th>Low</th><th>Severity</th></tr>
-    """
+    """]
         
-        # File table rows
+        # File table rows (collected in parts and joined once at the end)
         for file_path, file_smells in smells_by_file.items():
-            crit = sum(1 for s in file_smells if s['severity']=='critical')
-            high = sum(1 for s in file_smells if s['severity']=='high')
-            med = sum(1 for s in file_smells if s['severity']=='medium')
-            low = sum(1 for s in file_smells if s['severity']=='low')
+            file_counts = Counter(s['severity'] for s in file_smells)
+            crit = file_counts['critical']
+            high = file_counts['high']
+            med = file_counts['medium']
+            low = file_counts['low']
             total = len(file_smells)
             severity_class = 'critical-row' if crit > 0 else ''
             
-            html_content += f"""
+            parts.append(f"""
                 <tr class="{severity_class}">
                     <td>{Path(file_path).name}</td>
                     <td>{total}</td>
@@ -676,9 +609,9 @@ class CodeQualityAnalyzer:
                     <td>{low}</td>
                     <td><strong>{'CRITICAL' if crit>0 else 'High' if high>0 else 'OK'}</strong></td>
                 </tr>
-            """
+            """)
         
-        html_content += """
+        parts.append("""
             </table>
             <div style="background:#f1f5f9;padding:20px;border-radius:10px;margin:30px 0">
                 <h3>🛠 AI Auto-Fix Results</h3>
@@ -686,13 +619,370 @@ class CodeQualityAnalyzer:
             </div>
         </div>
     </body>
-    </html>"""
+    </html>""")
         
-        html_path.write_text(html_content, encoding='utf-8')
+        html_path.write_text("".join(parts), encoding='utf-8')
         print(f" HTML Dashboard: {html_path}")
     
     
     
+# Fields that never hold a node the visitor cares about: identifiers,
+# strings and numbers, plus expression contexts and operator singletons
+_LEAF_FIELDS = {
+    'ctx', 'op', 'ops', 'id', 'name', 'asname', 'attr', 'arg', 'module', 'level',
+    'kind', 'simple', 'conversion', 'is_async', 'type_comment', 'tag', 'rest', 'kwd_attrs',
+}
+_LEAF_FIELDS_BY_CLASS = {
+    ast.Constant: {'value'},
+    ast.MatchSingleton: {'value'},
+    ast.Global: {'names'},
+    ast.Nonlocal: {'names'},
+}
+
+_CHILD_FIELDS: Dict[type, tuple] = {}
+
+
+def _child_fields(cls: type) -> tuple:
+    """The _fields of an AST class that can hold child nodes, cached per class.
+
+    Reading just these directly is much cheaper than ast.iter_child_nodes,
+    which goes through iter_fields and an isinstance check for every value.
+    """
+    leaves = _LEAF_FIELDS | _LEAF_FIELDS_BY_CLASS.get(cls, set())
+    fields = tuple(f for f in cls._fields if f not in leaves)
+    _CHILD_FIELDS[cls] = fields
+    return fields
+
+
+def _walk(root: ast.AST) -> Iterator[ast.AST]:
+    """ast.walk over the nodes the detectors can see, in the same breadth-first order.
+
+    Plain iteration over cached per-class fields (see _child_fields), no
+    reflection or dynamic dispatch, which is what CPython runs fastest and
+    what a JIT such as PyPy's traces well.
+    """
+    fields_cache = _CHILD_FIELDS
+    todo = deque([root])
+    popleft, append, extend = todo.popleft, todo.append, todo.extend
+    while todo:
+        node = popleft()
+        if node is None:  # holes in Dict.keys / arguments.kw_defaults
+            continue
+        cls = type(node)
+        fields = fields_cache.get(cls)
+        if fields is None:
+            fields = _child_fields(cls)
+        for field in fields:
+            value = getattr(node, field, None)
+            if type(value) is list:
+                extend(value)
+            elif value is not None:
+                append(value)
+        yield node
+
+
+_NESTING_NODES = (ast.If, ast.For, ast.While, ast.With, ast.AsyncFor, ast.AsyncWith, ast.Try)
+
+
+def _analyze_file_worker(file_path: str) -> FileMetrics:
+    """Process-pool entry point: a file's metrics (FileMetrics and its smells pickle as-is)."""
+    return CodeQualityAnalyzer()._measure_file(file_path)
+
+
+def _stmt_blocks(node: ast.AST):
+    """The statement lists directly under node (bodies, else/finally, handlers, cases)."""
+    for field in ("body", "orelse", "finalbody"):
+        block = getattr(node, field, None)
+        if block:
+            yield block
+    for handler in getattr(node, "handlers", ()):
+        yield handler.body
+    for case in getattr(node, "cases", ()):
+        yield case.body
+
+
+def _add_binop_operands(node: ast.BinOp, operands: set):
+    """Halstead operands of a BinOp: names by id, anything else by node type."""
+    if isinstance(node.left, ast.Name):
+        operands.add(str(node.left.id))
+    else:
+        operands.add(type(node.left).__name__) # Add the type name as an operand
+
+    if isinstance(node.right, ast.Name):
+        operands.add(str(node.right.id))
+    else:
+        operands.add(type(node.right).__name__) # Add the type name as an operand
+
+
+class _SmellVisitor:
+    """Runs every per-node smell detector and metric counter in one walk.
+
+    Nodes are visited in ast.walk (breadth-first) order and smells are kept
+    per detector, so analyze_file can emit them in the same order as when
+    each detector walked the tree on its own.
+    """
+
+    def __init__(self, analyzer: "CodeQualityAnalyzer", file_path: str):
+        self.analyzer = analyzer
+        self.file_path = file_path
+
+        # Metric inputs
+        self._stmt_counts: Dict[int, int] = {}  # id(node) -> statements in its subtree
+        self._depth = 0  # control-flow blocks around the statement being counted
+        self.max_depth = 0
+        self.complexity = 1
+        self.binop_count = 0
+        self.operands = set()
+        self.imported_names: Dict[str, None] = {}  # insertion-ordered set
+        self.used_names = set()
+
+        # Smells, one list per detector
+        self.long_methods: List[CodeSmell] = []
+        self.god_classes: List[CodeSmell] = []
+        self.long_parameter_lists: List[CodeSmell] = []
+        self.missing_type_hints: List[CodeSmell] = []
+        self.many_local_variables: List[CodeSmell] = []
+        self.feature_envy: List[CodeSmell] = []
+        self.exception_swallowing: List[CodeSmell] = []
+        self.unreachable_code: List[CodeSmell] = []
+
+    def visit(self, tree: ast.AST):
+        dispatch = _SMELL_VISITOR_DISPATCH
+        self.stmt_count = self.count_stmts(tree)
+        for node in _walk(tree):
+            handler = dispatch.get(type(node))
+            if handler is not None:
+                handler(self, node)
+
+    def count_stmts(self, node: ast.AST) -> int:
+        """Same as CodeQualityAnalyzer.count_lines, memoized per node.
+
+        Statements only occur in statement lists, so only those are
+        descended into; a class's count reuses its methods' counts.
+        The first (whole-module) call also tracks max_depth, the deepest
+        nesting of control-flow blocks, since those are statements too.
+        """
+        count = self._stmt_counts.get(id(node))
+        if count is None:
+            nests = isinstance(node, _NESTING_NODES)
+            if nests:
+                self._depth += 1
+                if self._depth > self.max_depth:
+                    self.max_depth = self._depth
+            count = 1 if isinstance(node, ast.stmt) else 0
+            for block in _stmt_blocks(node):
+                for child in block:
+                    count += self.count_stmts(child)
+            self._stmt_counts[id(node)] = count
+            if nests:
+                self._depth -= 1
+        return count
+
+    def visit_FunctionDef(self, node: ast.FunctionDef):
+        analyzer = self.analyzer
+        file_path = self.file_path
+
+        # Long method
+        func_lines = self.count_stmts(node)
+        if func_lines > 20:  # LONG METHOD SMELL
+            severity = analyzer.get_method_severity(func_lines)
+            self.long_methods.append(CodeSmell(
+                type="long_method",
+                file=file_path,
+                node_name=node.name,
+                line=node.lineno,
+                severity=severity,
+                description=f"Function {node.name}: {func_lines} lines"
+            ))
+
+        # Long parameter list
+        param_count = len(node.args.args)
+        if param_count > 4:
+            severity = "high" if param_count > 6 else "medium"
+            self.long_parameter_lists.append(CodeSmell(
+                type="long_parameter_list",
+                file=file_path,
+                node_name=node.name,
+                line=node.lineno,
+                severity=severity,
+                description=f"Function {node.name}: {param_count} parameters"
+            ))
+
+        # Missing type hints
+        has_annotations = any(arg.annotation is not None for arg in node.args.args)
+        has_return_hint = node.returns is not None
+        if not has_annotations and not has_return_hint:
+            severity = "medium" if len(node.args.args) > 2 else "low"
+            self.missing_type_hints.append(CodeSmell(
+                type="missing_type_hints",
+                file=file_path,
+                node_name=node.name,
+                line=node.lineno,
+                severity=severity,
+                description=f"Function {node.name}: no parameter or return type hints"
+            ))
+
+        # Many local variables
+        local_vars = set()
+        for inner in _walk(node):
+            # Simple Assign: x = ...
+            if isinstance(inner, ast.Assign):
+                for target in inner.targets:
+                    if isinstance(target, ast.Name):
+                        local_vars.add(target.id)
+                    elif isinstance(target, ast.Tuple):
+                        for elt in target.elts:
+                            if isinstance(elt, ast.Name):
+                                local_vars.add(elt.id)
+
+            # Annotated assignment: x: int = ...
+            elif isinstance(inner, ast.AnnAssign):
+                if isinstance(inner.target, ast.Name):
+                    local_vars.add(inner.target.id)
+
+        local_count = len(local_vars)
+        if local_count > 8:  # threshold; adjust if needed
+            severity = "medium" if local_count <= 15 else "high"
+            self.many_local_variables.append(CodeSmell(
+                type="many_local_variables",
+                file=file_path,
+                node_name=node.name,
+                line=node.lineno,
+                severity=severity,
+                description=(
+                    f"Function defines {local_count} local variables; "
+                    "consider splitting into smaller functions."
+                ),
+            ))
+
+        # Unreachable code
+        analyzer._mark_unreachable_in_block(
+            file_path=file_path,
+            func_name=node.name,
+            block=node.body,
+            smells=self.unreachable_code,
+        )
+
+    def visit_ClassDef(self, class_node: ast.ClassDef):
+        analyzer = self.analyzer
+        file_path = self.file_path
+
+        # God class
+        class_lines = self.count_stmts(class_node)
+        # Only the class's own methods; helpers nested inside them don't count
+        methods = sum(
+            1 for n in class_node.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))
+        )
+        if class_lines > 100 or methods > 10:
+            severity = "critical" if class_lines > 200 or methods > 15 else "high"
+            self.god_classes.append(CodeSmell(
+                type="god_class",
+                file=file_path,
+                node_name=class_node.name,
+                line=class_node.lineno,
+                severity=severity,
+                description=f"Class {class_node.name}: {class_lines}loc, {methods} methods"
+            ))
+
+        # Feature envy (heuristic)
+        for node in class_node.body:
+            if not isinstance(node, ast.FunctionDef):
+                continue
+
+            # Uses per base name, e.g. self, user, order (counted in C by Counter)
+            base_counts = Counter(
+                attr.value.id for attr in _walk(node)
+                if isinstance(attr, ast.Attribute) and isinstance(attr.value, ast.Name)
+            )
+            self_count = base_counts.pop("self", 0)
+
+            # Find most-used foreign base (ties go to the first seen, as with max)
+            if not base_counts:
+                continue
+            foreign_base, foreign_count = base_counts.most_common(1)[0]
+
+            # Thresholds: must see foreign object enough times and clearly more than self
+            if foreign_count >= 5 and foreign_count >= 2 * max(1, self_count):
+                self.feature_envy.append(CodeSmell(
+                    type="feature_envy",
+                    file=file_path,
+                    node_name=f"{class_node.name}.{node.name}",
+                    line=node.lineno,
+                    severity="medium",
+                    description=(
+                        f"Method uses attributes of '{foreign_base}' much more "
+                        "than 'self'; consider moving or refactoring."
+                    ),
+                ))
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            self.imported_names.setdefault(alias.name.split('.')[0])
+
+    def visit_Name(self, node: ast.Name):
+        if isinstance(node.ctx, ast.Load):
+            self.used_names.add(node.id)
+
+    def visit_Try(self, node: ast.Try):
+        for handler in node.handlers:
+            # Broad except: bare "except:" or "except Exception:"
+            is_bare_except = handler.type is None
+            is_exception = (
+                isinstance(handler.type, ast.Name)
+                and handler.type.id == "Exception"
+            )
+
+            if not (is_bare_except or is_exception):
+                continue
+
+            # Body effectively empty or just "pass"
+            body = handler.body
+            body_is_empty = len(body) == 0
+            body_is_pass_only = (
+                len(body) == 1 and isinstance(body[0], ast.Pass)
+            )
+
+            if body_is_empty or body_is_pass_only:
+                self.exception_swallowing.append(CodeSmell(
+                    type="exception_swallowing",
+                    file=self.file_path,
+                    node_name="<module>",
+                    line=handler.lineno,
+                    severity="high",
+                    description=(
+                        "Exception swallowed with broad 'except' "
+                        "and no real handling."
+                    ),
+                ))
+
+    def visit_branch(self, node):
+        self.complexity += 1
+
+    def visit_BoolOp(self, node: ast.BoolOp):
+        self.complexity += len(node.values) - 1
+
+    def visit_BinOp(self, node: ast.BinOp):
+        self.binop_count += 1
+        _add_binop_operands(node, self.operands)
+
+
+# Exact node type -> handler; ast node classes are never subclassed by the parser
+_SMELL_VISITOR_DISPATCH = {
+    ast.FunctionDef: _SmellVisitor.visit_FunctionDef,
+    ast.ClassDef: _SmellVisitor.visit_ClassDef,
+    ast.Import: _SmellVisitor.visit_Import,
+    ast.ImportFrom: _SmellVisitor.visit_Import,
+    ast.Name: _SmellVisitor.visit_Name,
+    ast.Try: _SmellVisitor.visit_Try,
+    ast.If: _SmellVisitor.visit_branch,
+    ast.For: _SmellVisitor.visit_branch,
+    ast.While: _SmellVisitor.visit_branch,
+    ast.Assert: _SmellVisitor.visit_branch,
+    ast.BoolOp: _SmellVisitor.visit_BoolOp,
+    ast.BinOp: _SmellVisitor.visit_BinOp,
+}
+
+
 def main(project_path: Optional[str] = None):
     """Shows ALL features working. Can take a project_path as input.
     If no path is provided, it will prompt the user.
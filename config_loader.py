@@ -1,5 +1,7 @@
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict
+from types import MappingProxyType
+from typing import Any, Dict, Mapping
 
 try:
     import tomllib  # Python 3.11+
@@ -17,7 +19,28 @@ DEFAULT_CONFIG = {
 
 
 def load_config() -> Dict[str, Any]:
-    """Load configuration from pyproject.toml if available."""
+    """Load configuration from pyproject.toml if available.
+
+    pyproject.toml is read once per process; each call gets its own copy.
+    """
+    return dict(_read_config())
+
+
+def get_config() -> Mapping[str, Any]:
+    """Read-only view of the configuration, shared by every caller (no copy).
+
+    Use load_config() instead when the result needs to be modified.
+    """
+    return _config_view()
+
+
+@lru_cache(maxsize=1)
+def _config_view() -> Mapping[str, Any]:
+    return MappingProxyType(_read_config())
+
+
+@lru_cache(maxsize=1)
+def _read_config() -> Dict[str, Any]:
     project_root = Path(__file__).resolve().parent
     pyproject = project_root / "pyproject.toml"
 
@@ -1,9 +1,10 @@
 def god_function(a, b, c, d, e, f, g, h, i, j, k, l, m, n, o, p, q, r, s, t):
     """CRITICAL: God Function - 20 params + massive logic"""
-    result = a + b + c + d + e + f + g + h + i + j + k + l + m + n + o + p + q + r + s + t
+    args = (a, b, c, d, e, f, g, h, i, j, k, l, m, n, o, p, q, r, s, t)
+    result = sum(args)
     
-    # High cyclomatic complexity
-    if result > 100:
+    # High cyclomatic complexity (debug-only output: skipped under python -O)
+    if __debug__ and result > 100:
         if a > b and c > d:
             if e > f or g > h:
                 for x in range(20):
@@ -18,6 +19,8 @@ def god_function(a, b, c, d, e, f, g, h, i, j, k, l, m, n, o, p, q, r, s, t):
     
     return result * 42
 
+# Keep these as real defs: the analyzer only sees FunctionDef nodes, so a
+# __getattr__ no-op (or method2 = method1 aliases) would hide the smells.
 class GodClass:
     """CRITICAL: 10+ methods = Large Class"""
     def method1(self): pass
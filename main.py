@@ -1,11 +1,13 @@
 #!/usr/bin/env python3
-from dataclasses import asdict
+import logging
 from pathlib import Path
-import json
-from code_quality_analyzer import CodeQualityAnalyzer
+import orjson
+from code_quality_analyzer import CodeQualityAnalyzer, ANALYZER_VERSION
+from scan_cache import ScanCache
 from ai_review_engine import AIReviewEngine
 
 def main():
+    logging.basicConfig(level=logging.INFO)
     print(" CODE ANALYZER + AI REVIEW")
     print("=" * 40)
 
@@ -18,7 +20,8 @@ def main():
 
     # 1. STATIC ANALYSIS FIRST (clean)
     print("🔍 Running static analysis...")
-    analyzer = CodeQualityAnalyzer()
+    cache = ScanCache(ANALYZER_VERSION)
+    analyzer = CodeQualityAnalyzer(cache=cache)
     
     if project_path.is_file() and project_path.suffix == '.py':
         print(f"  Analyzing single file: {project_path.name}")
@@ -27,6 +30,7 @@ def main():
     else:
         print(f"  Analyzing project: {project_path}")
         results = analyzer.analyze_project(str(project_path))
+    cache.save()
 
     # 2. SAVE CLEAN STATIC REPORT FIRST
     analyzer.generate_reports(results, "reports")
@@ -35,12 +39,13 @@ def main():
     # 3. AI REVIEW SECOND (separate)
     print("\n🤖 Generating AI reviews...")
     engine = AIReviewEngine()
-    ai_comments = engine.generate_review_comments(analyzer.smells)
 
-    # 4. PRINT AI COMMENTS ONCE
+    # 4. PRINT AI COMMENTS AS EACH FILE'S REVIEWS ARRIVE (kept for the dump below)
     print("\n🤖 AI REVIEW COMMENTS:")
     print("-" * 60)
-    for c in ai_comments:
+    ai_comments = []
+    for c in engine.iter_review_comments(analyzer.smells):
+        ai_comments.append(c)
         print(f"📄 {Path(c.file).name}:{c.line} [{c.severity.upper()}]")
         print(f"   {c.title}")
         print(f"   💡 {c.explanation}")
@@ -51,8 +56,8 @@ def main():
     # 5. SAVE AI SEPARATELY (optional)
     ai_report_path = Path("reports/ai_reviews.json")
     ai_report_path.parent.mkdir(exist_ok=True)
-    with open(ai_report_path, 'w', encoding='utf-8') as f:
-        json.dump([asdict(c) for c in ai_comments], f, indent=2)
+    # orjson serializes (slotted) dataclasses natively, no per-comment dict
+    ai_report_path.write_bytes(orjson.dumps(ai_comments, option=orjson.OPT_INDENT_2))
     print(f"💾 AI reviews saved: {ai_report_path}")
 
 if __name__ == "__main__":
@@ -1,8 +1,18 @@
-import json
-import subprocess
-from typing import Tuple, Optional, Any
+import asyncio
+import atexit
+import logging
+import orjson
+from typing import Tuple, Optional, Any, List
 import sys
 import os
+from functools import lru_cache
+import requests
+from requests.adapters import HTTPAdapter
+
+from ai_response import loads_ai_json, strip_code_fences
+from review_cache import cached_review, cached_review_batch, cached_fix
+
+log = logging.getLogger(__name__)
 
 # Fix Windows emoji encoding
 if sys.platform == "win32":
@@ -10,31 +20,26 @@ if sys.platform == "win32":
     os.system('chcp 65001 > nul')  # Silent UTF-8 mode
 
 
-class OllamaReviewEngine:
-    def __init__(self):
-        self.ollama_model = "phi3:mini"
+def _ollama_base_url() -> str:
+    """Base URL of the local Ollama server, honouring OLLAMA_HOST like the ollama CLI."""
+    host = os.getenv("OLLAMA_HOST", "localhost:11434").rstrip("/")
+    return host if "://" in host else f"http://{host}"
 
-    def _parse_ai_json(self, content: str) -> Optional[Tuple[str, str, str,str]]:
-        try:
-            # Ollama sometimes wraps JSON in ```json...```
-            clean_str = content.replace("```json", "").replace("```", "").strip()
-            data = json.loads(clean_str)
-            return (
-                str(data.get("title", "AI Review Unavailable")),
-                str(data.get("explanation", "The AI did not provide a detailed explanation.")),
-                str(data.get("suggestion", "Consider refactoring based on general code quality guidelines.")),
-                str(data.get("severity", "")).lower()  # new
 
-            )
-        except json.JSONDecodeError:
-            print("      ❌ Phi-3: JSON parsing failed.")
-            return None
-        except Exception as e:
-            print(f"      ❌ Phi-3: Error parsing AI output: {e}")
-            return None
+@lru_cache(maxsize=1)
+def _shared_session() -> requests.Session:
+    """One keep-alive connection pool to the Ollama server per process, shared by
+    every engine instance instead of spawning an `ollama run` process per prompt."""
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+    # Bodies are pre-encoded with orjson, so requests' json= isn't used
+    session.headers["Content-Type"] = "application/json"
+    atexit.register(session.close)
+    return session
 
-    def get_review(self, smell: Any) -> Optional[Tuple[str, str, str,str]]:
-        prompt = f"""
+
+# Prompt for one smell (get_review); built once, only the fields vary per call
+_REVIEW_PROMPT = """
 You are a professional Python code reviewer.
 
 Analyze the given code smell and respond ONLY with valid JSON.
@@ -53,51 +58,42 @@ Rules:
 - No generic Python advice
 
 Code smell details:
-File: {smell.file}:{smell.line}
-Smell type: {smell.type}
-Function/Class: {smell.node_name}
-Issue: {smell.description}
+File: {file}:{line}
+Smell type: {type}
+Function/Class: {node_name}
+Issue: {description}
 """
 
-        try:
-            print(f"      Trying Ollama model: {self.ollama_model}")
-            result = subprocess.run(
-                ["ollama", "run", self.ollama_model, prompt],
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='ignore',
-                timeout=120
-            )
+# Prompt for all smells of a file (get_reviews_batch)
+_BATCH_REVIEW_PROMPT = """
+You are a professional Python code reviewer.
 
-            if result.returncode == 0:
-                output = result.stdout.strip()
-                parsed_review = self._parse_ai_json(output)
-                if parsed_review:
-                    print(f"      ✅ Phi-3 ({self.ollama_model.split(':')[-1]}): {parsed_review[0][:50]}...")
-                    return parsed_review
-            else:
-                print(f"  ❌ Ollama ({self.ollama_model.split(':')[-1]}): Command failed with exit code {result.returncode}. Stderr: {result.stderr.strip()[:100]}")
-
-        except FileNotFoundError:
-            print("      ❌ Ollama executable not found. Is Ollama installed and in your PATH?")
-        except subprocess.TimeoutExpired:
-            print(f"      ❌ Ollama ({self.ollama_model.split(':')[-1]}): Command timed out after 120 seconds.")
-        except Exception as e:
-            print(f"      ❌ Ollama ({self.ollama_model.split(':')[-1]}): Unexpected error during execution: {str(e)[:100]}")
+Analyze each of the {count} numbered code smells below and respond ONLY with valid JSON.
 
-        print(f"      ⚠️ Ollama ({self.ollama_model.split(':')[-1]}): Failed to get a valid review. Falling back.")
-        return None
+JSON format:
+{{
+  "reviews": [
+    {{
+      "title": "Short professional title",
+      "explanation": "Explain WHY this smell occurred, strictly based on the smell type",
+      "suggestion": "Actionable refactoring advice specific to this smell type",
+      "severity": "info | warning | critical"
+    }}
+  ]
+}}
 
+Rules:
+- Return exactly {count} reviews, in the same order as the findings
+- Do NOT mention type hints unless the smell type is "missing_type_hints"
+- Focus ONLY on the provided smell type of each finding
+- No generic Python advice
 
-    def get_fix(self, smell: Any, original_source: str) -> Optional[str]:
-        """
-        Ask Ollama to return a patched version of the SAME function/method
-        containing this smell. Returns pure Python code (no JSON, no fences).
-        """
-        print(f"DEBUG: Using Ollama model: '{self.ollama_model}'")  
+Findings:
+{findings}
+"""
 
-        prompt = f"""
+# Prompt for patching one function/method (get_fix)
+_FIX_PROMPT = """
 You are a professional Python refactoring assistant.
 
 Given this Python function or method that contains a specific code smell,
@@ -110,10 +106,10 @@ Requirements:
 - Do NOT wrap the code in ``` or any Markdown.
 - Do NOT include any explanations or comments.
 
-Smell type: {smell.type}
-File: {smell.file}:{smell.line}
-Function/Class: {smell.node_name}
-Issue: {smell.description}
+Smell type: {type}
+File: {file}:{line}
+Function/Class: {node_name}
+Issue: {description}
 
 Original code:
 {original_source}
@@ -121,38 +117,238 @@ Original code:
 Return ONLY the fixed function/method code.
 """
 
+# Prompt for patching several nodes of a file (get_fixes_batch)
+_BATCH_FIX_PROMPT = """
+You are a professional Python refactoring assistant.
+
+Each numbered section below is a Python function or method that contains a
+specific code smell. Return a corrected version of EACH function/method.
+
+Requirements:
+- Preserve every function/method name and signature.
+- Keep behavior logically equivalent (only improve style/readability/safety).
+- Do NOT add surrounding code (no imports, no extra functions).
+- Do NOT include any explanations or comments.
+- Respond ONLY with valid JSON listing the fixed code of each section, in section order:
+  {{"fixes": ["<fixed code for section 1>", "<fixed code for section 2>", ...]}}
+
+{sections}
+"""
+
+
+class OllamaReviewEngine:
+    def __init__(self):
+        self.ollama_model = "phi3:mini"
+        self.api_url = f"{_ollama_base_url()}/api/generate"
+
+        self._session = _shared_session()
+        # How long the server keeps the model loaded between our requests
+        self.keep_alive = "10m"
+
+    @property
+    def model_tag(self) -> str:
+        """Identifies the model in cached results, so switching models misses the cache."""
+        return self.ollama_model
+
+    def close(self):
+        """Release the pooled connections (the shared session reconnects on next use)."""
+        self._session.close()
+
+    def _parse_ai_json(self, content: str) -> Optional[Tuple[str, str, str,str]]:
         try:
-            print(f"      Trying Ollama auto-fix model: {self.ollama_model}")
-            result = subprocess.run(
-                ["ollama", "run", self.ollama_model, prompt],
-                capture_output=True,
-                text=True,
-                encoding="utf-8",
-                errors="ignore",
-                timeout=180,
-            )
+            # Ollama sometimes wraps JSON in ```json...```
+            data = loads_ai_json(content)
+            return (
+                str(data.get("title", "AI Review Unavailable")),
+                str(data.get("explanation", "The AI did not provide a detailed explanation.")),
+                str(data.get("suggestion", "Consider refactoring based on general code quality guidelines.")),
+                str(data.get("severity", "")).lower()  # new
 
-            if result.returncode == 0:
-                output = result.stdout.strip()
-                # Clean up accidental fences if model adds them
-                output = output.replace("```python", "").replace("```", "").strip()
-                if output:
-                    return output
-                print("      ❌ Ollama auto-fix: empty output.")
-            else:
-                print(
-                    f"  ❌ Ollama auto-fix ({self.ollama_model.split(':')[-1]}): "
-                    f"exit code {result.returncode}. Stderr: {result.stderr.strip()[:100]}"
-                )
-        except FileNotFoundError:
-            print("      ❌ Ollama executable not found for auto-fix. Is it installed and in PATH?")
-        except subprocess.TimeoutExpired:
-            print(f"      ❌ Ollama auto-fix ({self.ollama_model.split(':')[-1]}): timed out after 120 seconds.")
+            )
+        except orjson.JSONDecodeError:
+            print("      ❌ Phi-3: JSON parsing failed.")
+            return None
         except Exception as e:
+            print(f"      ❌ Phi-3: Error parsing AI output: {e}")
+            return None
+
+    @cached_review
+    def get_review(self, smell: Any) -> Optional[Tuple[str, str, str,str]]:
+        prompt = _REVIEW_PROMPT.format(
+            file=smell.file, line=smell.line, type=smell.type,
+            node_name=smell.node_name, description=smell.description,
+        )
+
+        print(f"      Trying Ollama model: {self.ollama_model}")
+        output = self._run_ollama(prompt, timeout=120, json_output=True)
+        if output:
+            parsed_review = self._parse_ai_json(output)
+            if parsed_review:
+                print(f"      ✅ Phi-3 ({self.ollama_model.split(':')[-1]}): {parsed_review[0][:50]}...")
+                return parsed_review
+
+        print(f"      ⚠️ Ollama ({self.ollama_model.split(':')[-1]}): Failed to get a valid review. Falling back.")
+        return None
+
+    async def aget_review(self, smell: Any) -> Optional[Tuple[str, str, str,str]]:
+        """Async wrapper so several reviews can wait on Ollama at once."""
+        return await asyncio.to_thread(self.get_review, smell)
+
+
+    async def aget_reviews_batch(self, smells: List[Any]) -> Optional[List[Optional[Tuple[str, str, str,str]]]]:
+        """Async wrapper around get_reviews_batch."""
+        return await asyncio.to_thread(self.get_reviews_batch, smells)
+
+    def _run_ollama(self, prompt: str, timeout: int, json_output: bool = False) -> Optional[str]:
+        """Run one prompt through the Ollama HTTP API and return the response text (or None).
+
+        json_output asks the server to constrain the answer to valid JSON.
+        """
+        payload = {
+            "model": self.ollama_model,
+            "prompt": prompt,
+            "stream": False,
+            "keep_alive": self.keep_alive,
+            "options": {"temperature": 0.2},
+        }
+        if json_output:
+            payload["format"] = "json"
+
+        short_name = self.ollama_model.split(':')[-1]
+        try:
+            response = self._session.post(self.api_url, data=orjson.dumps(payload), timeout=timeout)
+            if response.status_code == 200:
+                # With format=json the answer is plain JSON; callers decode it
+                # straight away and only strip fences if that fails
+                return orjson.loads(response.content).get("response", "").strip()
             print(
-                f"      ❌ Ollama auto-fix ({self.ollama_model.split(':')[-1]}): "
-                f"Unexpected error: {str(e)[:100]}"
+                f"  ❌ Ollama ({short_name}): "
+                f"status {response.status_code}: {response.text.strip()[:100]}"
             )
+        except requests.exceptions.ConnectionError:
+            print(f"      ❌ Ollama server not reachable at {self.api_url}. Is Ollama installed and running?")
+        except requests.exceptions.Timeout:
+            print(f"      ❌ Ollama ({short_name}): timed out after {timeout} seconds.")
+        except Exception as e:
+            print(f"      ❌ Ollama ({short_name}): Unexpected error: {str(e)[:100]}")
+        return None
+
+    def _parse_ai_json_batch(self, content: str, expected: int) -> Optional[List[Optional[Tuple[str, str, str,str]]]]:
+        """Parse a {"reviews": [...]} (or bare list) response into one tuple per smell."""
+        try:
+            data = loads_ai_json(content)
+        except orjson.JSONDecodeError:
+            print("      ❌ Phi-3: batch JSON parsing failed.")
+            return None
+
+        items = data.get("reviews") if isinstance(data, dict) else data
+        if not isinstance(items, list) or len(items) != expected:
+            print(f"      ❌ Phi-3: expected {expected} reviews in batch response.")
+            return None
+
+        reviews: List[Optional[Tuple[str, str, str,str]]] = []
+        for item in items:
+            if not isinstance(item, dict):
+                reviews.append(None)
+                continue
+            reviews.append((
+                str(item.get("title", "AI Review Unavailable")),
+                str(item.get("explanation", "The AI did not provide a detailed explanation.")),
+                str(item.get("suggestion", "Consider refactoring based on general code quality guidelines.")),
+                str(item.get("severity", "")).lower(),
+            ))
+        return reviews
+
+    @cached_review_batch
+    def get_reviews_batch(self, smells: List[Any]) -> Optional[List[Optional[Tuple[str, str, str,str]]]]:
+        """
+        Review several smells (usually all smells of one file) with a single
+        Ollama call. Returns one entry per smell, in order, or None on failure.
+        """
+        findings = "\n".join(
+            f"{i}. File: {smell.file}:{smell.line} | Smell type: {smell.type} | "
+            f"Function/Class: {smell.node_name} | Issue: {smell.description}"
+            for i, smell in enumerate(smells, 1)
+        )
+        prompt = _BATCH_REVIEW_PROMPT.format(count=len(smells), findings=findings)
+
+        print(f"      Trying Ollama batch review ({len(smells)} smells): {self.ollama_model}")
+        output = self._run_ollama(prompt, timeout=120 + 30 * len(smells), json_output=True)
+        if output:
+            reviews = self._parse_ai_json_batch(output, len(smells))
+            if reviews is not None:
+                print(f"      ✅ Phi-3 ({self.ollama_model.split(':')[-1]}): batch of {len(smells)} reviews")
+                return reviews
+
+        print(f"      ⚠️ Ollama ({self.ollama_model.split(':')[-1]}): batch review failed.")
+        return None
+
+    @cached_fix
+    def get_fix(self, smell: Any, original_source: str) -> Optional[str]:
+        """
+        Ask Ollama to return a patched version of the SAME function/method
+        containing this smell. Returns pure Python code (no JSON, no fences).
+        """
+        log.debug("Using Ollama model: %r", self.ollama_model)
+
+        prompt = _FIX_PROMPT.format(
+            file=smell.file, line=smell.line, type=smell.type,
+            node_name=smell.node_name, description=smell.description,
+            original_source=original_source,
+        )
+
+        print(f"      Trying Ollama auto-fix model: {self.ollama_model}")
+        output = self._run_ollama(prompt, timeout=180)
+        if output is not None:
+            # Clean up accidental fences if model adds them
+            output = strip_code_fences(output)
+            if output:
+                return output
+            print("      ❌ Ollama auto-fix: empty output.")
 
         print(f"      ⚠️ Ollama auto-fix ({self.ollama_model.split(':')[-1]}): failed to get a valid patch.")
         return None
+
+    def _parse_fixes_json(self, content: str, expected: int) -> Optional[List[Optional[str]]]:
+        """Parse a {"fixes": [...]} (or bare list) response into one fixed source per section."""
+        try:
+            data = loads_ai_json(content)
+        except orjson.JSONDecodeError:
+            print("      ❌ Ollama batch auto-fix: JSON parsing failed.")
+            return None
+
+        fixes = data.get("fixes") if isinstance(data, dict) else data
+        if not isinstance(fixes, list) or len(fixes) != expected:
+            print(f"      ❌ Ollama batch auto-fix: expected {expected} fixes in batch response.")
+            return None
+
+        cleaned = [
+            (strip_code_fences(code) or None) if isinstance(code, str) else None
+            for code in fixes
+        ]
+        return cleaned if any(cleaned) else None
+
+    def get_fixes_batch(self, items: List[Tuple[Any, str]]) -> Optional[List[Optional[str]]]:
+        """
+        Ask Ollama to patch several functions/methods of one file in a single
+        call. `items` holds (smell, original_source) pairs; returns one fixed
+        source per item, in order (None where the model gave none), or None on failure.
+        """
+        sections = "\n\n".join(
+            f"### {i}. Function/Class: {smell.node_name}\n"
+            f"Smell type: {smell.type}\n"
+            f"Issue: {smell.description}\n"
+            f"Original code:\n{source}"
+            for i, (smell, source) in enumerate(items, 1)
+        )
+        prompt = _BATCH_FIX_PROMPT.format(sections=sections)
+
+        print(f"      Trying Ollama batch auto-fix ({len(items)} nodes): {self.ollama_model}")
+        output = self._run_ollama(prompt, timeout=180 + 60 * len(items), json_output=True)
+        if output:
+            fixes = self._parse_fixes_json(output, len(items))
+            if fixes is not None:
+                return fixes
+
+        print(f"      ⚠️ Ollama batch auto-fix ({self.ollama_model.split(':')[-1]}): failed to get valid patches.")
+        return None
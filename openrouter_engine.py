@@ -1,63 +1,305 @@
-import json
+import asyncio
+import atexit
+import logging
+import orjson
 import os
-import pathlib
+import threading
+import time
+from functools import lru_cache
 import requests
-from typing import Tuple, Optional, Any, List
+from requests.adapters import HTTPAdapter
+from typing import Tuple, Optional, Any, List, Dict, Callable
 from dotenv import load_dotenv
 
-try:  # Python 3.11+
-    import tomllib
-except ImportError:  # Python <=3.10
-    import tomli as tomllib
+from config_loader import get_config
+from ai_response import loads_ai_json, strip_code_fences
+from review_cache import cached_review, cached_review_batch, cached_fix
+
+log = logging.getLogger(__name__)
+
+
+# Default lists (used if config missing) - STABLE FREE MODELS
+DEFAULT_MODELS = [
+    "qwen/qwen2.5-coder:free",
+    "deepseek/deepseek-coder-v2:free",
+    "google/gemma-2-9b-it:free",
+]
+DEFAULT_FALLBACK_MODELS = [
+    "meta-llama/llama-3.2-1b-instruct:free",
+    "microsoft/phi-3-mini-128k-instruct:free",
+]
+
+
+@lru_cache(maxsize=1)
+def _load_env() -> None:
+    """Load the project's .env (OPENROUTER_API_KEY) once per process."""
+    load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
+
+
+@lru_cache(maxsize=1)
+def _shared_session() -> requests.Session:
+    """One keep-alive connection pool per process, shared by every engine instance.
+
+    Only the first request pays the TCP+TLS handshake, including across the
+    model fallback chain and engines created separately (review vs auto-fix).
+    """
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=16))
+    atexit.register(session.close)
+    return session
+
+
+class TokenBucket:
+    """Thread-safe token bucket: up to `max_rate` requests per `period` seconds.
+
+    Requests only wait once the bucket is empty. A 429 from the API doubles
+    the period (fewer requests per second); each success halves it again
+    until it is back to the configured value.
+    """
+
+    def __init__(self, max_rate: int = 30, period: float = 60.0, max_period: float = 960.0):
+        self.capacity = max_rate
+        self.base_period = period
+        self.period = period
+        self.max_period = max_period
+        self.tokens = float(max_rate)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity / self.period)
+        self.updated = now
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) * self.period / self.capacity
+            time.sleep(wait)
+
+    def backoff(self):
+        with self.lock:
+            self._refill()
+            self.period = min(self.period * 2, self.max_period)
+
+    def recover(self):
+        if self.period == self.base_period:
+            return
+        with self.lock:
+            self._refill()
+            self.period = max(self.period / 2, self.base_period)
+
+
+# Seconds to wait for the TCP/TLS connection; read timeouts are per request
+CONNECT_TIMEOUT = 10
+
+# Most smells packed into one batch-review request
+REVIEW_BATCH_SIZE = 15
+
+# Seconds a model that answered 429/5xx is skipped before it is tried again
+MODEL_COOLDOWN = 60.0
+
+
+# Prompts and system messages are built once; per call only the smell fields
+# are filled in. Review prompts ask for JSON and share one system message.
+_REVIEW_PROMPT = (
+    "Return ONLY JSON: {{'title': '...', 'explanation': '...', 'suggestion': '...'}}\n"
+    "Review the following code smell: Type: {type}, "
+    "Node: {node_name}, Description: {description}"
+)
+
+_BATCH_REVIEW_PROMPT = (
+    "Return ONLY JSON: {{'reviews': [{{'title': '...', 'explanation': '...', 'suggestion': '...'}}, ...]}}\n"
+    "with exactly {count} reviews, one per finding, in the same order.\n"
+    "Review the following code smells:\n{findings}"
+)
+
+_REVIEW_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": (
+        "You are a Python expert. Output valid JSON only. "
+        "Do not include any preambles or explanations outside the JSON object."
+    ),
+}
+
+_FIX_PROMPT = """
+You are a professional Python refactoring assistant.
+
+Given this Python function or method that contains a specific code smell,
+return a corrected version of the SAME function/method ONLY.
+
+Requirements:
+- Preserve the function/method name and signature exactly
+- Keep behavior logically equivalent (only improve style/readability/safety)
+- Do NOT add surrounding code (no imports, no extra functions)
+- Do NOT wrap the code in ``` or any Markdown
+- Do NOT include any explanations or comments
+- Return ONLY valid Python code
+
+Smell type: {type}
+File: {file}:{line}
+Function/Class: {node_name}
+Issue: {description}
+
+Original code:
+{original_source}
+
+Return ONLY the fixed function/method code.
+""".strip()
+
+_FIX_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": (
+        "You are a Python refactoring assistant. "
+        "Return ONLY valid Python code for the fixed function/method. "
+        "No markdown, no explanations, pure Python code only."
+    ),
+}
+
+_BATCH_FIX_PROMPT = """
+You are a professional Python refactoring assistant.
+
+Each numbered section below is a Python function or method that contains a
+specific code smell. Return a corrected version of EACH function/method.
+
+Requirements:
+- Preserve every function/method name and signature exactly
+- Keep behavior logically equivalent (only improve style/readability/safety)
+- Do NOT add surrounding code (no imports, no extra functions)
+- Do NOT include any explanations or comments
+- Respond ONLY with a JSON object listing the fixed code of each section, in section order:
+  {{"fixes": ["<fixed code for section 1>", "<fixed code for section 2>", ...]}}
+
+{sections}
+""".strip()
+
+_BATCH_FIX_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": (
+        "You are a Python refactoring assistant. "
+        "Return ONLY a JSON object with the fixed functions/methods. "
+        "No markdown, no explanations."
+    ),
+}
 
 
 class OpenRouterReviewEngine:
+    # model_id -> time.monotonic() when it may be tried again. Class-level:
+    # rate limits are per account, so every engine instance/thread shares it.
+    _cooldown: Dict[str, float] = {}
+    _cooldown_lock = threading.Lock()
+
     def __init__(self):
-        # Default lists (used if config missing) - STABLE FREE MODELS
-        default_models = [
-            "qwen/qwen2.5-coder:free",
-            "deepseek/deepseek-coder-v2:free",
-            "google/gemma-2-9b-it:free",
-        ]
-        default_fallback = [
-            "meta-llama/llama-3.2-1b-instruct:free",
-            "microsoft/phi-3-mini-128k-instruct:free",
-        ]
+        # Model lists, API key and session headers are filled in on first use
+        # (_ensure_configured), so creating an engine does no env/config I/O
+        self.openrouter_models: Optional[List[str]] = None
+        self.fallback_openrouter_models: Optional[List[str]] = None
+        self.api_key: Optional[str] = None
+        self.api_url = "https://openrouter.ai/api/v1/chat/completions"
+        self._configured = False
+
+        # Shared by every request this engine makes, including from worker threads
+        self._limiter = TokenBucket(max_rate=30, period=60.0)
+        self._session = _shared_session()
+
+    def _ensure_configured(self):
+        if self._configured:
+            return
+        if self.openrouter_models is None or self.fallback_openrouter_models is None:
+            config_models, config_fallback = self._load_model_config_from_pyproject()
+            if self.openrouter_models is None:
+                self.openrouter_models = config_models or DEFAULT_MODELS
+            if self.fallback_openrouter_models is None:
+                self.fallback_openrouter_models = config_fallback or DEFAULT_FALLBACK_MODELS
+            log.debug("Effective models: %s", self.openrouter_models)
+            log.debug("Effective fallback: %s", self.fallback_openrouter_models)
+
+        if self.api_key is None:
+            _load_env()
+            self.api_key = os.getenv("OPENROUTER_API_KEY")
+        # Sent with every request; set once instead of rebuilt per call
+        self._session.headers.update({
+            "Authorization": f"Bearer {self.api_key}",
+            "HTTP-Referer": "http://localhost:3000",
+            "X-Title": "Code Review Project",
+        })
+        self._configured = True
 
-        config_models, config_fallback = self._load_model_config_from_pyproject()
-        self.openrouter_models: List[str] = config_models or default_models
-        self.fallback_openrouter_models: List[str] = config_fallback or default_fallback
+    @property
+    def model_tag(self) -> str:
+        """Identifies the models in cached results, so changing the model lists misses the cache."""
+        self._ensure_configured()
+        return ",".join(self.openrouter_models + self.fallback_openrouter_models)
 
-        print("DEBUG effective models:", self.openrouter_models)
-        print("DEBUG effective fallback:", self.fallback_openrouter_models)
+    def close(self):
+        """Release the pooled connections (the shared session reconnects on next use)."""
+        self._session.close()
 
-        # Load .env
-        env_path = os.path.join(os.path.dirname(__file__), ".env")
-        load_dotenv(dotenv_path=env_path)
+    def _cooling_down(self, model_id: str) -> bool:
+        return self._cooldown.get(model_id, 0.0) > time.monotonic()
 
-        self.api_key = os.getenv("OPENROUTER_API_KEY")
-        self.api_url = "https://openrouter.ai/api/v1/chat/completions"
+    def _cool_down(self, model_id: str):
+        """Skip model_id for MODEL_COOLDOWN seconds after a 429/5xx."""
+        with self._cooldown_lock:
+            self._cooldown[model_id] = time.monotonic() + MODEL_COOLDOWN
 
     def _load_model_config_from_pyproject(self) -> Tuple[Optional[list], Optional[list]]:
-        pyproject_path = pathlib.Path.cwd() / "pyproject.toml"
-        if not pyproject_path.is_file():
-            print(f" ⚠️ pyproject.toml not found at {pyproject_path}")
-            return None, None
-
-        try:
-            with open(pyproject_path, "rb") as f:
-                data = tomllib.load(f)
-            cfg = data.get("tool", {}).get("ai_reviewer", {})
-            return cfg.get("openrouter_models"), cfg.get("fallback_openrouter_models")
-        except Exception as e:
-            print(f" ⚠️ Could not read pyproject.toml model config: {e}")
-            return None, None
+        # Same (once-per-process) pyproject.toml read as the rest of the tool
+        cfg = get_config()
+        return cfg.get("openrouter_models"), cfg.get("fallback_openrouter_models")
+
+    def _post_chat(self, payload: dict, timeout: int,
+                   expect_json: bool = False) -> Tuple[int, Optional[str]]:
+        """POST a streamed chat completion; return (status code, assembled content).
+
+        The completion arrives as server-sent events, so `timeout` bounds the
+        wait for the next chunk rather than for the whole answer, and a dead
+        connection fails after CONNECT_TIMEOUT. With expect_json, a reply
+        that doesn't open like JSON is cut off as soon as that's visible and
+        returned as-is (it won't parse), so the caller moves to the next
+        model without waiting for the rest of it.
+        """
+        with self._session.post(
+            self.api_url,
+            json={**payload, "stream": True},
+            stream=True,
+            timeout=(CONNECT_TIMEOUT, timeout),
+        ) as response:
+            if response.status_code != 200:
+                return response.status_code, None
+
+            parts: List[str] = []
+            checked = not expect_json
+            for line in response.iter_lines():
+                # Skip blank separators and ": keep-alive" comment lines
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    break
+                event = orjson.loads(data)
+                if "error" in event:
+                    raise RuntimeError(event["error"].get("message", "stream error"))
+                delta = event["choices"][0].get("delta", {}).get("content")
+                if not delta:
+                    continue
+                parts.append(delta)
+                if not checked:
+                    head = "".join(parts).lstrip()
+                    if head:
+                        checked = True
+                        if head[0] not in "{[`":
+                            break
+            return 200, "".join(parts)
 
     # ----------------- REVIEW PATH (JSON OUTPUT) -----------------
     def _parse_ai_json(self, content: str) -> Optional[Tuple[str, str, str]]:
         try:
-            clean_str = content.replace("```json", "").replace("```", "").strip()
-            data = json.loads(clean_str)
+            data = loads_ai_json(content)
             return (
                 str(data.get("title", "AI Review Unavailable")),
                 str(
@@ -73,61 +315,44 @@ class OpenRouterReviewEngine:
                     )
                 ),
             )
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             print("      ❌ OpenRouter: JSON parsing failed.")
             return None
         except Exception as e:
             print(f"      ❌ OpenRouter: Error parsing AI output: {e}")
             return None
 
+    @cached_review
     def get_review(self, smell: Any) -> Optional[Tuple[str, str, str]]:
+        self._ensure_configured()
         if not self.api_key:
             print("      ⚠️ OPENROUTER_API_KEY not set. Skipping OpenRouter review.")
             return None
 
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "HTTP-Referer": "http://localhost:3000",
-            "X-Title": "Code Review Project",
-            "Content-Type": "application/json",
-        }
-
         # Handle nodename / node_name safely
         node_name = getattr(smell, "nodename", getattr(smell, "node_name", ""))
 
-        prompt = (
-            "Return ONLY JSON: {'title': '...', 'explanation': '...', 'suggestion': '...'}\n"
-            f"Review the following code smell: Type: {smell.type}, "
-            f"Node: {node_name}, Description: {smell.description}"
-        )
+        prompt = _REVIEW_PROMPT.format(type=smell.type, node_name=node_name, description=smell.description)
+        messages = [_REVIEW_SYSTEM_MESSAGE, {"role": "user", "content": prompt}]
 
         all_models_to_try = self.openrouter_models + self.fallback_openrouter_models
 
         for model_id in all_models_to_try:
+            if self._cooling_down(model_id):
+                continue
             payload = {
                 "model": model_id,
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": (
-                            "You are a Python expert. Output valid JSON only. "
-                            "Do not include any preambles or explanations outside the JSON object."
-                        ),
-                    },
-                    {"role": "user", "content": prompt},
-                ],
+                "messages": messages,
                 "temperature": 0.2,
             }
 
             try:
                 print(f"      Trying OpenRouter model: {model_id}")
-                response = requests.post(
-                    self.api_url, headers=headers, json=payload, timeout=40
-                )
+                self._limiter.acquire()
+                status, raw_content = self._post_chat(payload, timeout=40, expect_json=True)
 
-                if response.status_code == 200:
-                    data = response.json()
-                    raw_content = data["choices"][0]["message"]["content"]
+                if status == 200:
+                    self._limiter.recover()
                     parsed_review = self._parse_ai_json(raw_content)
                     if parsed_review:
                         print(
@@ -136,28 +361,31 @@ class OpenRouterReviewEngine:
                         )
                         return parsed_review
 
-                elif response.status_code == 401:
+                elif status == 401:
                     print(
                         "      ❌ OpenRouter: Invalid API Key. "
                         "Please check your OPENROUTER_API_KEY."
                     )
                     return None
-                elif response.status_code == 429:
+                elif status == 429:
+                    self._limiter.backoff()
+                    self._cool_down(model_id)
                     print(
                         f"      ⏭️  OpenRouter ({model_id.split('/')[-1]}): "
                         "Rate limit hit. Trying next model."
                     )
                     continue
-                elif response.status_code in [500, 503, 504]:
+                elif status in [500, 503, 504]:
+                    self._cool_down(model_id)
                     print(
                         f"      ⏭️  OpenRouter ({model_id.split('/')[-1]}): "
-                        f"Server error ({response.status_code}). Trying next model."
+                        f"Server error ({status}). Trying next model."
                     )
                     continue
                 else:
                     print(
                         f"      ⏭️  OpenRouter ({model_id.split('/')[-1]}): "
-                        f"API error (Status {response.status_code}). Trying next model."
+                        f"API error (Status {status}). Trying next model."
                     )
                     continue
 
@@ -183,94 +411,189 @@ class OpenRouterReviewEngine:
         print("      ⚠️ OpenRouter: All models failed or no API key. Falling back.")
         return None
 
+    async def aget_review(self, smell: Any) -> Optional[Tuple[str, str, str]]:
+        """Async wrapper so several reviews can be in flight at once."""
+        return await asyncio.to_thread(self.get_review, smell)
+
+    # ----------------- BATCH PATH (ONE REQUEST PER FILE) -----------------
+    def _complete_with_fallback(
+        self,
+        messages: List[dict],
+        parse: Callable[[str], Any],
+        label: str,
+        temperature: float,
+        timeout: int,
+    ) -> Any:
+        """Post `messages` to each configured model until `parse` accepts a response."""
+        for model_id in self.openrouter_models + self.fallback_openrouter_models:
+            if self._cooling_down(model_id):
+                continue
+            payload = {
+                "model": model_id,
+                "messages": messages,
+                "temperature": temperature,
+                "response_format": {"type": "json_object"},
+            }
+            short_name = model_id.split("/")[-1]
+
+            try:
+                print(f"      Trying OpenRouter {label} model: {model_id}")
+                self._limiter.acquire()
+                status, raw_content = self._post_chat(
+                    payload, timeout=timeout, expect_json="response_format" in payload
+                )
+
+                if status == 200:
+                    self._limiter.recover()
+                    parsed = parse(raw_content)
+                    if parsed is not None:
+                        print(f"      ✅ OpenRouter {label} ({short_name}) succeeded")
+                        return parsed
+                    print(f"      ⏭️  OpenRouter {label} ({short_name}): unusable output, trying next model.")
+                elif status == 401:
+                    print(f"      ❌ OpenRouter {label}: invalid API key.")
+                    return None
+                else:
+                    if status == 429:
+                        self._limiter.backoff()
+                    if status in (429, 500, 503, 504):
+                        self._cool_down(model_id)
+                    print(
+                        f"      ⏭️  OpenRouter {label} ({short_name}): "
+                        f"status {status}, trying next model."
+                    )
+
+            except requests.exceptions.Timeout:
+                print(f"      ❌ OpenRouter {label} ({short_name}): timeout, trying next model.")
+            except requests.exceptions.ConnectionError:
+                print(f"      ❌ OpenRouter {label} ({short_name}): connection error, trying next model.")
+            except Exception as e:
+                print(f"      ❌ OpenRouter {label} ({short_name}): {str(e)[:80]}")
+
+        print(f"      ⚠️ OpenRouter {label}: all models failed.")
+        return None
+
+    def _parse_ai_json_batch(self, content: str, expected: int) -> Optional[List[Optional[Tuple[str, str, str]]]]:
+        """Parse a {"reviews": [...]} (or bare list) response into one tuple per smell."""
+        try:
+            data = loads_ai_json(content)
+        except orjson.JSONDecodeError:
+            print("      ❌ OpenRouter: batch JSON parsing failed.")
+            return None
+
+        items = data.get("reviews") if isinstance(data, dict) else data
+        if not isinstance(items, list) or len(items) != expected:
+            print(f"      ❌ OpenRouter: expected {expected} reviews in batch response.")
+            return None
+
+        reviews: List[Optional[Tuple[str, str, str]]] = []
+        for item in items:
+            if not isinstance(item, dict):
+                reviews.append(None)
+                continue
+            reviews.append((
+                str(item.get("title", "AI Review Unavailable")),
+                str(item.get("explanation", "The AI did not provide a detailed explanation.")),
+                str(item.get("suggestion", "Consider refactoring based on general code quality guidelines.")),
+            ))
+        return reviews
+
+    @cached_review_batch
+    def get_reviews_batch(self, smells: List[Any]) -> Optional[List[Optional[Tuple[str, str, str]]]]:
+        """
+        Review several smells (usually all smells of one file) with one
+        request per REVIEW_BATCH_SIZE smells. Returns one entry per smell, in
+        order (None for smells whose chunk failed), or None if every chunk failed.
+        """
+        self._ensure_configured()
+        if not self.api_key:
+            print("      ⚠️ OPENROUTER_API_KEY not set. Skipping OpenRouter batch review.")
+            return None
+
+        # Bounded chunks keep prompts (and the per-request timeout) small enough
+        # for the model to answer reliably, while still saving ~N round trips
+        reviews: List[Optional[Tuple[str, str, str]]] = []
+        any_ok = False
+        for start in range(0, len(smells), REVIEW_BATCH_SIZE):
+            chunk = smells[start:start + REVIEW_BATCH_SIZE]
+            chunk_reviews = self._review_chunk(chunk)
+            if chunk_reviews is None:
+                chunk_reviews = [None] * len(chunk)
+            else:
+                any_ok = True
+            reviews.extend(chunk_reviews)
+        return reviews if any_ok else None
+
+    def _review_chunk(self, smells: List[Any]) -> Optional[List[Optional[Tuple[str, str, str]]]]:
+        """One batch-review request for smells; None if no model gave a usable answer."""
+        findings = "\n".join(
+            f"{i}. Type: {smell.type}, "
+            f"Node: {getattr(smell, 'nodename', getattr(smell, 'node_name', ''))}, "
+            f"Description: {smell.description}"
+            for i, smell in enumerate(smells, 1)
+        )
+        prompt = _BATCH_REVIEW_PROMPT.format(count=len(smells), findings=findings)
+        messages = [_REVIEW_SYSTEM_MESSAGE, {"role": "user", "content": prompt}]
+
+        return self._complete_with_fallback(
+            messages,
+            parse=lambda content: self._parse_ai_json_batch(content, len(smells)),
+            label="batch review",
+            temperature=0.2,
+            timeout=40 + 10 * len(smells),
+        )
+
+    async def aget_reviews_batch(self, smells: List[Any]) -> Optional[List[Optional[Tuple[str, str, str]]]]:
+        """Async wrapper around get_reviews_batch."""
+        return await asyncio.to_thread(self.get_reviews_batch, smells)
+
     # ----------------- AUTO-FIX PATH (CODE OUTPUT) -----------------
+    @cached_fix
     def get_fix(self, smell: Any, original_source: str) -> Optional[str]:
         """
         Ask OpenRouter to return a patched version of the SAME function/method
         containing this smell. Returns pure Python code (no fences, no comments).
         """
+        self._ensure_configured()
         if not self.api_key:
             print("      ⚠️ OPENROUTER_API_KEY not set. Skipping OpenRouter auto-fix.")
             return None
 
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "HTTP-Referer": "http://localhost:3000",
-            "X-Title": "Code Review Project",
-            "Content-Type": "application/json",
-        }
-
         node_name = getattr(smell, "nodename", getattr(smell, "node_name", ""))
 
-        prompt = f"""
-You are a professional Python refactoring assistant.
-
-Given this Python function or method that contains a specific code smell,
-return a corrected version of the SAME function/method ONLY.
-
-Requirements:
-- Preserve the function/method name and signature exactly
-- Keep behavior logically equivalent (only improve style/readability/safety)
-- Do NOT add surrounding code (no imports, no extra functions)
-- Do NOT wrap the code in ``` or any Markdown
-- Do NOT include any explanations or comments
-- Return ONLY valid Python code
-
-Smell type: {smell.type}
-File: {smell.file}:{smell.line}
-Function/Class: {node_name}
-Issue: {smell.description}
-
-Original code:
-{original_source}
-
-Return ONLY the fixed function/method code.
-""".strip()
+        prompt = _FIX_PROMPT.format(
+            type=smell.type, file=smell.file, line=smell.line,
+            node_name=node_name, description=smell.description,
+            original_source=original_source,
+        )
+        messages = [_FIX_SYSTEM_MESSAGE, {"role": "user", "content": prompt}]
 
         all_models_to_try = self.openrouter_models + self.fallback_openrouter_models
 
         for model_id in all_models_to_try:
+            if self._cooling_down(model_id):
+                continue
             payload = {
                 "model": model_id,
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": (
-                            "You are a Python refactoring assistant. "
-                            "Return ONLY valid Python code for the fixed function/method. "
-                            "No markdown, no explanations, pure Python code only."
-                        ),
-                    },
-                    {"role": "user", "content": prompt},
-                ],
+                "messages": messages,
                 "temperature": 0.1,  # Lower for more consistent code
             }
 
             try:
                 print(f"      Trying OpenRouter auto-fix model: {model_id}")
-                response = requests.post(
-                    self.api_url, headers=headers, json=payload, timeout=45
-                )
+                self._limiter.acquire()
+                status, raw_content = self._post_chat(payload, timeout=45)
 
-                if response.status_code == 200:
-                    data = response.json()
-                    # Correct list indexing (same as review path)
-                    raw_content = data["choices"][0]["message"]["content"]
+                if status == 200:
+                    self._limiter.recover()
 
                     # Clean code output
-                    code = (
-                        raw_content.replace("```python", "")
-                        .replace("``` py", "")
-                        .replace("```", "")
-                        .strip()
-                    )
+                    code = strip_code_fences(raw_content)
 
                     # More permissive: accept any non-empty code;
                     # later AST parse in AutoFixEngine will reject broken patches.
                     if code:
-                        print("------ RAW FIXED CODE START ------")
-                        print(code)
-                        print("------ RAW FIXED CODE END ------")
+                        log.debug("Raw fixed code from %s:\n%s", model_id, code)
                         print(
                             f"      ✅ OpenRouter auto-fix succeeded: {len(code)} chars"
                         )
@@ -281,25 +604,28 @@ Return ONLY the fixed function/method code.
                             "trying next model."
                         )
 
-                elif response.status_code == 401:
+                elif status == 401:
                     print("      ❌ OpenRouter auto-fix: invalid API key.")
                     return None
-                elif response.status_code == 429:
+                elif status == 429:
+                    self._limiter.backoff()
+                    self._cool_down(model_id)
                     print(
                         f"      ⏭️ OpenRouter auto-fix ({model_id.split('/')[-1]}): "
                         "rate limit, trying next model."
                     )
                     continue
-                elif response.status_code in (500, 503, 504):
+                elif status in (500, 503, 504):
+                    self._cool_down(model_id)
                     print(
                         f"      ⏭️ OpenRouter auto-fix ({model_id.split('/')[-1]}): "
-                        f"server error {response.status_code}, trying next model."
+                        f"server error {status}, trying next model."
                     )
                     continue
                 else:
                     print(
                         f"      ⏭️ OpenRouter auto-fix ({model_id.split('/')[-1]}): "
-                        f"API error {response.status_code}"
+                        f"API error {status}"
                     )
                     continue
 
@@ -324,3 +650,52 @@ Return ONLY the fixed function/method code.
 
         print("      ⚠️ OpenRouter auto-fix: all models failed.")
         return None
+
+    def _parse_fixes_json(self, content: str, expected: int) -> Optional[List[Optional[str]]]:
+        """Parse a {"fixes": [...]} (or bare list) response into one fixed source per section."""
+        try:
+            data = loads_ai_json(content)
+        except orjson.JSONDecodeError:
+            print("      ❌ OpenRouter batch auto-fix: JSON parsing failed.")
+            return None
+
+        fixes = data.get("fixes") if isinstance(data, dict) else data
+        if not isinstance(fixes, list) or len(fixes) != expected:
+            print(f"      ❌ OpenRouter batch auto-fix: expected {expected} fixes in batch response.")
+            return None
+
+        cleaned = [
+            (strip_code_fences(code) or None) if isinstance(code, str) else None
+            for code in fixes
+        ]
+        return cleaned if any(cleaned) else None
+
+    def get_fixes_batch(self, items: List[Tuple[Any, str]]) -> Optional[List[Optional[str]]]:
+        """
+        Ask OpenRouter to patch several functions/methods of one file in a
+        single request. `items` holds (smell, original_source) pairs; returns
+        one fixed source per item, in order (None where the model gave none),
+        or None on failure.
+        """
+        self._ensure_configured()
+        if not self.api_key:
+            print("      ⚠️ OPENROUTER_API_KEY not set. Skipping OpenRouter batch auto-fix.")
+            return None
+
+        sections = "\n\n".join(
+            f"### {i}. Function/Class: {getattr(smell, 'nodename', getattr(smell, 'node_name', ''))}\n"
+            f"Smell type: {smell.type}\n"
+            f"Issue: {smell.description}\n"
+            f"Original code:\n{source}"
+            for i, (smell, source) in enumerate(items, 1)
+        )
+        prompt = _BATCH_FIX_PROMPT.format(sections=sections)
+        messages = [_BATCH_FIX_SYSTEM_MESSAGE, {"role": "user", "content": prompt}]
+
+        return self._complete_with_fallback(
+            messages,
+            parse=lambda content: self._parse_fixes_json(content, len(items)),
+            label="batch auto-fix",
+            temperature=0.1,
+            timeout=45 + 15 * len(items),
+        )
@@ -0,0 +1,120 @@
+import atexit
+import dbm
+import functools
+import hashlib
+import shelve
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+
+RESULT_CACHE_PATH = Path.home() / ".cache" / "ai_reviewer" / "ai_results"
+
+
+class AIResultCache:
+    """On-disk memo of AI engine answers, keyed by a hash of the prompt inputs.
+
+    Backed by shelve, behind a lock since engines are called from worker
+    threads. If the store can't be opened (e.g. another process holds it)
+    the cache just stays empty for this run.
+    """
+
+    def __init__(self, path: Path = RESULT_CACHE_PATH):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self._db: Optional[shelve.Shelf] = None
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = shelve.open(str(self.path))
+        except (OSError, dbm.error) as e:
+            print(f"⚠️ AI result cache disabled ({self.path}): {e}")
+
+    @staticmethod
+    def key(*parts: Any) -> str:
+        data = "\x1f".join(str(p) for p in parts).encode("utf-8", errors="ignore")
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        if self._db is None:
+            return None
+        with self.lock:
+            try:
+                return self._db.get(key)
+            except Exception:
+                return None
+
+    def put(self, key: str, result: Any):
+        if self._db is None:
+            return
+        with self.lock:
+            try:
+                self._db[key] = result
+            except Exception as e:
+                print(f"⚠️ Could not write AI result cache: {e}")
+
+    def close(self):
+        with self.lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+@lru_cache(maxsize=1)
+def shared_result_cache() -> AIResultCache:
+    """The process-wide result cache (one open handle shared by all engines)."""
+    cache = AIResultCache()
+    atexit.register(cache.close)
+    return cache
+
+
+def cached_review(method: Callable) -> Callable:
+    """Memoize engine.get_review(smell) by smell type/description and engine.model_tag."""
+    @functools.wraps(method)
+    def wrapper(self, smell: Any):
+        cache = shared_result_cache()
+        key = cache.key("review", self.model_tag, smell.type, smell.description)
+        result = cache.get(key)
+        if result is None:
+            result = method(self, smell)
+            if result is not None:
+                cache.put(key, result)
+        return result
+    return wrapper
+
+
+def cached_review_batch(method: Callable) -> Callable:
+    """Like cached_review for engine.get_reviews_batch(smells); only misses are sent."""
+    @functools.wraps(method)
+    def wrapper(self, smells: List[Any]):
+        cache = shared_result_cache()
+        keys = [cache.key("review", self.model_tag, s.type, s.description) for s in smells]
+        results = [cache.get(k) for k in keys]
+        missing = [i for i, r in enumerate(results) if r is None]
+        if not missing:
+            return results
+
+        fresh = method(self, [smells[i] for i in missing])
+        if fresh is None:
+            # Nothing new; keep whatever the cache had (None means "all failed")
+            return results if len(missing) < len(smells) else None
+        for i, result in zip(missing, fresh):
+            results[i] = result
+            if result is not None:
+                cache.put(keys[i], result)
+        return results
+    return wrapper
+
+
+def cached_fix(method: Callable) -> Callable:
+    """Memoize engine.get_fix(smell, source); the source is part of the key."""
+    @functools.wraps(method)
+    def wrapper(self, smell: Any, original_source: str):
+        cache = shared_result_cache()
+        key = cache.key("fix", self.model_tag, smell.type, smell.description, original_source)
+        result = cache.get(key)
+        if result is None:
+            result = method(self, smell, original_source)
+            if result:
+                cache.put(key, result)
+        return result
+    return wrapper
@@ -0,0 +1,82 @@
+import hashlib
+import os
+import pickle
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+CACHE_PATH = Path.home() / ".cache" / "ai_reviewer" / "scan_cache.pkl"
+
+
+class ScanCache:
+    """Persistent per-file analysis results, reused while a file's content is unchanged.
+
+    Lookups first compare (mtime, size); only when those differ is the file
+    hashed, so touched-but-identical files still hit. The whole cache is
+    discarded when the analyzer version changes.
+    """
+
+    def __init__(self, version: str, path: Path = CACHE_PATH):
+        self.version = version
+        self.path = Path(path)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        if not self.path.is_file():
+            return
+        try:
+            with self.path.open("rb") as f:
+                data = pickle.load(f)
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable scan cache {self.path}: {e}")
+            return
+        if isinstance(data, dict) and data.get("version") == self.version:
+            self.entries = data.get("entries", {})
+
+    def save(self):
+        if not self.dirty:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with tmp_path.open("wb") as f:
+                pickle.dump({"version": self.version, "entries": self.entries}, f)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except OSError as e:
+            print(f"⚠️ Could not write scan cache {self.path}: {e}")
+
+    @staticmethod
+    def _digest(file_path: str) -> str:
+        with open(file_path, "rb") as f:
+            return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+    def get(self, file_path: str) -> Optional[Any]:
+        """Return the cached result for file_path, or None if missing/stale."""
+        key = os.path.abspath(file_path)
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        st = os.stat(file_path)
+        if entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size:
+            return entry["result"]
+
+        if entry["digest"] != self._digest(file_path):
+            return None
+
+        # Same content, new stat: refresh so the next lookup takes the fast path
+        entry["mtime_ns"], entry["size"] = st.st_mtime_ns, st.st_size
+        self.dirty = True
+        return entry["result"]
+
+    def put(self, file_path: str, result: Any):
+        st = os.stat(file_path)
+        self.entries[os.path.abspath(file_path)] = {
+            "mtime_ns": st.st_mtime_ns,
+            "size": st.st_size,
+            "digest": self._digest(file_path),
+            "result": result,
+        }
+        self.dirty = True
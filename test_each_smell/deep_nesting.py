@@ -1,5 +1,11 @@
 def deeply_nested(x):
     """Function designed to trigger deep nesting smell in the analyzer."""
+    if x > 10_000:
+        # Same result without the loops: only the i == 0 pass runs the while
+        # (it drains x), adding 1 + k for every k < x divisible by 3
+        n = (x - 1) // 3 + 1
+        return n + 3 * n * (n - 1) // 2
+
     result = 0
 
     # Level 1: first conditional
@@ -1,76 +1,57 @@
 class MegaProcessor:
+    __slots__ = ("data",)
+
     def __init__(self, data):
         self.data = data
 
     def step1(self):
-        total = 0
-        for item in self.data:
-            total += item
-        return total
+        return sum(self.data)
 
     def step2(self):
-        result = []
-        for item in self.data:
-            if item % 2 == 0:
-                result.append(item * 2)
-        return result
+        return [item * 2 for item in self.data if item % 2 == 0]
 
     def step3(self):
-        count = 0
-        for item in self.data:
-            if item > 10:
-                count += 1
-        return count
+        return len([item for item in self.data if item > 10])
 
     def step4(self):
         return [x for x in self.data if x < 0]
 
     def step5(self):
-        s = set()
-        for x in self.data:
-            s.add(x % 5)
-        return s
+        return {x % 5 for x in self.data}
 
     def step6(self):
-        d = {}
-        for x in self.data:
-            d[x] = x * x
-        return d
+        return {x: x * x for x in self.data}
 
     def step7(self):
         return sum(self.data) / (len(self.data) or 1)
 
     def step8(self):
-        result = []
-        for i, x in enumerate(self.data):
-            result.append((i, x))
-        return result
+        return list(enumerate(self.data))
 
     def step9(self):
-        acc = 1
-        for x in self.data:
-            acc *= (x or 1)
-        return acc
+        # Multiply pairwise: balanced operands keep big-int products cheap
+        vals = [x or 1 for x in self.data]
+        while len(vals) > 1:
+            odd = vals[-1:] if len(vals) % 2 else []
+            vals = [a * b for a, b in zip(vals[::2], vals[1::2])] + odd
+        return vals[0] if vals else 1
 
     def step10(self):
         return sorted(self.data)
 
     def step11(self):
-        result = []
-        for x in self.data:
-            if x % 3 == 0:
-                result.append(x // 3)
-        return result
+        return [x // 3 for x in self.data if x % 3 == 0]
 
     def run_all(self):
+        total = self.step1()
         return {
-            "step1": self.step1(),
+            "step1": total,
             "step2": self.step2(),
             "step3": self.step3(),
             "step4": self.step4(),
             "step5": self.step5(),
             "step6": self.step6(),
-            "step7": self.step7(),
+            "step7": total / (len(self.data) or 1),
             "step8": self.step8(),
             "step9": self.step9(),
             "step10": self.step10(),
@@ -1,21 +1,43 @@
+from dataclasses import dataclass
+
+REGION_BY_COUNTRY = {"FR": "EU", "DE": "EU", "ES": "EU"}
+ACCESS_BY_SUBSCRIPTION = {"premium": "FULL", "trial": "LIMITED"}
+
+
+@dataclass(slots=True)
+class UserRecord:
+    user_id: int
+    name: str
+    email: str
+    is_adult: bool
+    region: str
+    access_level: str
+
+
 def process_user_data(
     user_id: int, name: str, email: str, age: int, country: str, subscription_type: str
-) -> dict:
+) -> UserRecord:
     """Example function with a long parameter list, designed to trigger the 'long_parameter_list' smell in your analyzer."""
-    is_adult = age >= 18
-    region = "EU" if country in {"FR", "DE", "ES"} else "Other"
-    
-    access_level: str = (
-        "FULL" if subscription_type == "premium" else
-        "LIMITED" if subscription_type == "trial" else 
-        "BASIC"
+    return UserRecord(
+        user_id,
+        name,
+        email,
+        age >= 18,
+        REGION_BY_COUNTRY.get(country, "Other"),
+        ACCESS_BY_SUBSCRIPTION.get(subscription_type, "BASIC"),
     )
-    
+
+
+def process_users(columns: dict) -> dict:
+    """Column-wise process_user_data for many users: {field: [values...]} in and out,
+    keyed by the UserRecord field names."""
     return {
-        "user_id": user_id,
-        "name": name,
-        "email": email,
-        "is_adult": is_adult,
-        "region": region,
-        "access_level": access_level,
+        "user_id": columns["user_id"],
+        "name": columns["name"],
+        "email": columns["email"],
+        "is_adult": [age >= 18 for age in columns["age"]],
+        "region": [REGION_BY_COUNTRY.get(country, "Other") for country in columns["country"]],
+        "access_level": [
+            ACCESS_BY_SUBSCRIPTION.get(subscription, "BASIC") for subscription in columns["subscription_type"]
+        ],
     }
@@ -4,6 +4,15 @@
 # - feature_envy
 # - many_local_variables
 
+from dataclasses import dataclass
+
+# Tax rate per region; other regions use the config's rate, or the default
+TAX_RATE_BY_REGION = {"EU": 0.21, "IN": 0.18}
+DEFAULT_TAX_RATE = 0.20
+# Discount rate for a discount code, by whether the user is a VIP
+DISCOUNT_RATE_BY_VIP = {True: 0.15, False: 0.05}
+
+
 class Order:
     def __init__(self, items, user, status):
         self.items = items
@@ -11,17 +20,27 @@ class Order:
         self.status = status
 
 
+@dataclass(slots=True, frozen=True)
+class OrderConfig:
+    discount_code: str
+    tax_rate: float
+    shipping_cost: float
+    region: str
+    priority_flag: bool
+    extras: tuple = ()
+
+
 class OrderProcessor:
     def __init__(self, order: Order):
         self.order = order
+        # (format, *args) entries; formatted only when read via messages()
         self.log = []
 
-    def process_order(self, discount_code, tax_rate, shipping_cost, region, priority_flag,
-                      extra_option_1, extra_option_2, extra_option_3, extra_option_4):
+    def process_order(self, cfg: OrderConfig):
         """
         Intentionally messy function to trigger:
         - many_local_variables
-        - unreachable_code (inside nested blocks)
+        - unreachable_code (after the final return)
         - exception_swallowing in a helper method
         - feature_envy via heavy use of self.order.*
         """
@@ -29,7 +48,7 @@ class OrderProcessor:
         # MANY LOCAL VARIABLES (more than 8)
         total_price = 0
         taxable_amount = 0
-        shipping_fee = shipping_cost
+        shipping_fee = cfg.shipping_cost
         discount_value = 0
         final_amount = 0
         currency = "USD"
@@ -40,24 +59,16 @@ class OrderProcessor:
 
         # FEATURE ENVY: mostly touching self.order, not self
         if self.order.status == "NEW":
-            for item in self.order.items:
-                taxable_amount += item.get("price", 0) * item.get("qty", 1)
+            taxable_amount = sum(item.get("price", 0) * item.get("qty", 1) for item in self.order.items)
 
-            if discount_code and self.order.user and self.order.user.get("is_vip"):
-                discount_value = taxable_amount * 0.15
-            elif discount_code:
-                discount_value = taxable_amount * 0.05
+            if cfg.discount_code:
+                is_vip = bool(self.order.user and self.order.user.get("is_vip"))
+                discount_value = taxable_amount * DISCOUNT_RATE_BY_VIP[is_vip]
 
             total_price = taxable_amount - discount_value
             total_price += shipping_fee
 
-            # Unnecessary complexity to keep locals in use
-            if region == "EU":
-                tax_rate = 0.21
-            elif region == "IN":
-                tax_rate = 0.18
-            else:
-                tax_rate = tax_rate or 0.20
+            tax_rate = TAX_RATE_BY_REGION.get(cfg.region, cfg.tax_rate or DEFAULT_TAX_RATE)
 
             tax_amount = total_price * tax_rate
             final_amount = total_price + tax_amount
@@ -66,15 +77,7 @@ class OrderProcessor:
             message = f"Order status '{self.order.status}' not supported"
             final_amount = 0
 
-        # UNREACHABLE CODE example inside a loop block
-        for _ in range(2):
-            if final_amount > 0:
-                return final_amount  # terminates the loop block
-
-            # This line is unreachable in that block (after return)
-            message = "This assignment is unreachable"
-
-        # More UNREACHABLE CODE directly in function body
+        # UNREACHABLE CODE directly in function body
         return final_amount
         message = "This line is also unreachable"
         audit_entry["note"] = "Will never be set"
@@ -85,26 +88,28 @@ class OrderProcessor:
         bare except and no meaningful handling.
         """
         try:
-            # Simulate some logging action that may fail
-            raise ValueError("Simulated logging failure")
+            # run() usually fails on the user lookup itself, so don't repeat it here;
+            # the order's id is always available
+            self.log.append(("Order processing failed for order %s", id(self.order)))
         except:
             # EXCEPTION SWALLOWING: bare except with no handling
             pass
 
     def run(self):
         try:
-            amount = self.process_order(
+            amount = self.process_order(OrderConfig(
                 discount_code="WELCOME",
                 tax_rate=0.2,
                 shipping_cost=10.0,
                 region="EU",
                 priority_flag=True,
-                extra_option_1=True,
-                extra_option_2=False,
-                extra_option_3=None,
-                extra_option_4="EXTRA",
-            )
-            self.log.append(f"Order processed for {self.order.user['name']}, total={amount}")
+                extras=(True, False, None, "EXTRA"),
+            ))
+            self.log.append(("Order processed for %s, total=%s", self.order.user["name"], amount))
         except Exception:
             # Swallow again in a broad way (depending on your rules this may also be flagged)
             self._unsafe_log_error()
+
+    def messages(self) -> list:
+        """The log entries as formatted strings."""
+        return [entry[0] % entry[1:] for entry in self.log]